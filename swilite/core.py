@@ -660,6 +660,44 @@ pl_wchar_t = c_wchar
 PL_register_foreign = _lib.PL_register_foreign
 PL_register_foreign.restype = c_int
 
+# PL_EXPORT(int)        PL_register_foreign_in_module(const char *module,
+#                                                     const char *name,
+#                                                     int arity,
+#                                                     pl_function_t func,
+#                                                     int flags, ...);
+PL_register_foreign_in_module = _lib.PL_register_foreign_in_module
+PL_register_foreign_in_module.restype = c_int
+
+# Signature of foreign functions registered with PL_FA_VARARGS:
+# foreign_t (*)(term_t t0, int arity, control_t context)
+pl_function_va_t = CFUNCTYPE(foreign_t, term_t, c_int, control_t)
+
+#                 /* Non-deterministic call/return */
+# PL_EXPORT(int)        PL_foreign_control(control_t);
+PL_foreign_control = _lib.PL_foreign_control
+PL_foreign_control.argtypes = [control_t]
+PL_foreign_control.restype = c_int
+
+# PL_EXPORT(intptr_t)   PL_foreign_context(control_t);
+PL_foreign_context = _lib.PL_foreign_context
+PL_foreign_context.argtypes = [control_t]
+PL_foreign_context.restype = intptr_t
+
+# PL_EXPORT(void *)     PL_foreign_context_address(control_t);
+PL_foreign_context_address = _lib.PL_foreign_context_address
+PL_foreign_context_address.argtypes = [control_t]
+PL_foreign_context_address.restype = c_void_p
+
+# PL_EXPORT(foreign_t)  _PL_retry(intptr_t);
+_PL_retry = _lib._PL_retry
+_PL_retry.argtypes = [intptr_t]
+_PL_retry.restype = foreign_t
+
+# PL_EXPORT(foreign_t)  _PL_retry_address(void *);
+_PL_retry_address = _lib._PL_retry_address
+_PL_retry_address.argtypes = [c_void_p]
+_PL_retry_address.restype = foreign_t
+
 #                /********************************
 #                *            MODULES            *
 #                *********************************/
@@ -1467,6 +1505,69 @@ PL_halt = _lib.PL_halt
 PL_halt.argtypes = [c_int]
 PL_halt.restype = None
 
+#                  /*******************************
+#                  *      THREADS AND ENGINES     *
+#                  *******************************/
+#
+# typedef struct
+# { long          local_size;     /* Stack sizes (Kbytes) */
+#   long          global_size;
+#   long          trail_size;
+#   long          argument_size;
+#   char *        alias;          /* alias name */
+#   int          (*cancel)(int id);  /* cancel function */
+#   intptr_t      flags;          /* PL_THREAD_* flags */
+#   void *        reserved[4];    /* reserved for extensions */
+# } PL_thread_attr_t;
+
+
+class PL_thread_attr_t(Structure):
+    _fields_ = [("local_size", c_long),
+                ("global_size", c_long),
+                ("trail_size", c_long),
+                ("argument_size", c_long),
+                ("alias", c_char_p),
+                ("cancel", CFUNCTYPE(c_int, c_int)),
+                ("flags", intptr_t),
+                ("reserved", c_void_p * 4)]
+
+PL_ENGINE_MAIN = 0x1     # (PL_engine_t)0x1
+PL_ENGINE_CURRENT = 0x2  # (PL_engine_t)0x2
+
+PL_ENGINE_SET = 0    # engine set successfully
+PL_ENGINE_INVAL = 2  # engine doesn't exist
+PL_ENGINE_INUSE = 3  # engine is in use
+
+# PL_EXPORT(int)        PL_thread_self(void);
+PL_thread_self = _lib.PL_thread_self
+PL_thread_self.argtypes = []
+PL_thread_self.restype = c_int
+
+# PL_EXPORT(int)        PL_thread_attach_engine(PL_thread_attr_t *attr);
+PL_thread_attach_engine = _lib.PL_thread_attach_engine
+PL_thread_attach_engine.argtypes = [POINTER(PL_thread_attr_t)]
+PL_thread_attach_engine.restype = c_int
+
+# PL_EXPORT(int)        PL_thread_destroy_engine(void);
+PL_thread_destroy_engine = _lib.PL_thread_destroy_engine
+PL_thread_destroy_engine.argtypes = []
+PL_thread_destroy_engine.restype = c_int
+
+# PL_EXPORT(PL_engine_t)        PL_create_engine(PL_thread_attr_t *attributes);
+PL_create_engine = _lib.PL_create_engine
+PL_create_engine.argtypes = [POINTER(PL_thread_attr_t)]
+PL_create_engine.restype = PL_engine_t
+
+# PL_EXPORT(int)        PL_set_engine(PL_engine_t engine, PL_engine_t *old);
+PL_set_engine = _lib.PL_set_engine
+PL_set_engine.argtypes = [PL_engine_t, POINTER(PL_engine_t)]
+PL_set_engine.restype = c_int
+
+# PL_EXPORT(int)        PL_destroy_engine(PL_engine_t engine);
+PL_destroy_engine = _lib.PL_destroy_engine
+PL_destroy_engine.argtypes = [PL_engine_t]
+PL_destroy_engine.restype = c_int
+
 
 # typedef struct
 # {
@@ -1489,8 +1590,10 @@ class mbstate_t(Structure):
                 ("__value", _mbstate_t_value)]
 
 # stream related funcs
-Sread_function = CFUNCTYPE(ssize_t, c_void_p, c_char_p, c_size_t)
-Swrite_function = CFUNCTYPE(ssize_t, c_void_p, c_char_p, c_size_t)
+# The buffers are POINTER(c_char) rather than c_char_p so that callbacks
+# receive the buffer address instead of a copy of a NUL-terminated string.
+Sread_function = CFUNCTYPE(ssize_t, c_void_p, POINTER(c_char), c_size_t)
+Swrite_function = CFUNCTYPE(ssize_t, c_void_p, POINTER(c_char), c_size_t)
 Sseek_function = CFUNCTYPE(c_long, c_void_p, c_long, c_int)
 Sseek64_function = CFUNCTYPE(c_int64, c_void_p, c_int64, c_int)
 Sclose_function = CFUNCTYPE(c_int, c_void_p)
@@ -1507,8 +1610,19 @@ class IOFUNCTIONS(Structure):
                 ("write", Swrite_function),
                 ("seek", Sseek_function),
                 ("close", Sclose_function),
-                ("seek64", Sseek64_function),
-                ("reserved", intptr_t * 2)]
+                ("control", Scontrol_function),
+                ("seek64", Sseek64_function)]
+
+# IOSTREAM flags
+SIO_FBUF = 0x0001  # full buffering
+SIO_LBUF = 0x0002  # line buffering
+SIO_NBUF = 0x0004  # no buffering
+SIO_FEOF = 0x0008  # end-of-file
+SIO_FERR = 0x0010  # error ocurred
+SIO_INPUT = 0x0040  # input stream
+SIO_OUTPUT = 0x0080  # output stream
+SIO_RECORDPOS = 0x0800  # maintain position
+SIO_TEXT = 0x8000  # text-mode
 
 # IOENC
 (ENC_UNKNOWN, ENC_OCTET, ENC_ASCII, ENC_ISO_LATIN_1, ENC_ANSI, ENC_UTF8,
@@ -1559,6 +1673,21 @@ Sopen_string = _lib.Sopen_string
 Sopen_string.argtypes = [POINTER(IOSTREAM), c_char_p, c_size_t, c_char_p]
 Sopen_string.restype = POINTER(IOSTREAM)
 
+# PL_EXPORT(IOSTREAM *)  Snew(void *handle, int flags, IOFUNCTIONS *functions);
+Snew = _lib.Snew
+Snew.argtypes = [c_void_p, c_int, POINTER(IOFUNCTIONS)]
+Snew.restype = POINTER(IOSTREAM)
+
+# PL_EXPORT(int)         Ssetenc(IOSTREAM *s, IOENC new_enc, IOENC *old_enc);
+Ssetenc = _lib.Ssetenc
+Ssetenc.argtypes = [POINTER(IOSTREAM), IOENC, POINTER(IOENC)]
+Ssetenc.restype = c_int
+
+# PL_EXPORT(int)         Sflush(IOSTREAM *s);
+Sflush = _lib.Sflush
+Sflush.argtypes = [POINTER(IOSTREAM)]
+Sflush.restype = c_int
+
 # PL_EXPORT(int)         Sclose(IOSTREAM *s);
 Sclose = _lib.Sclose
 Sclose.argtypes = [POINTER(IOSTREAM)]
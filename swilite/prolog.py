@@ -1,9 +1,27 @@
 """An object-oriented interface to Prolog."""
-from collections import namedtuple
+import asyncio
+import csv
+import functools
+import inspect
+import io
+import itertools
+import math
+import mmap
+import multiprocessing
+import os
+import queue
+import struct
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
 from ctypes import (
     POINTER,
+    addressof,
     byref,
     c_char,
+    cast,
     c_double,
     c_int,
     c_int64,
@@ -13,14 +31,28 @@ from ctypes import (
 
 from swilite.core import (
     BUF_DISCARDABLE,
+    CVT_STRING,
     CVT_WRITEQ,
+    ENC_OCTET,
+    ENC_UTF8,
+    IOFUNCTIONS,
     PL_ATOM,
     PL_BLOB,
+    PL_CYCLIC_TERM,
     PL_DICT,
+    PL_ENGINE_INUSE,
+    PL_ENGINE_SET,
+    PL_FA_NONDETERMINISTIC,
+    PL_FA_VARARGS,
+    PL_FIRST_CALL,
     PL_FLOAT,
     PL_INTEGER,
+    PL_LIST,
     PL_LIST_PAIR,
     PL_NIL,
+    PL_NOT_A_LIST,
+    PL_PARTIAL_LIST,
+    PL_PRUNED,
     PL_Q_CATCH_EXCEPTION,
     PL_Q_NODEBUG,
     PL_STRING,
@@ -30,16 +62,23 @@ from swilite.core import (
     PL_call,
     PL_call_predicate,
     PL_chars_to_term,
+    PL_cleanup_fork,
     PL_close_foreign_frame,
     PL_close_query,
     PL_cons_functor,
     PL_cons_functor_v,
     PL_cons_list,
     PL_context,
-    PL_copy_term_ref,
+    PL_cut_query,
+    PL_create_engine,
+    PL_destroy_engine,
     PL_discard_foreign_frame,
+    PL_engine_t,
     PL_erase,
+    PL_erase_external,
     PL_exception,
+    PL_foreign_context,
+    PL_foreign_control,
     PL_functor_arity,
     PL_functor_name,
     PL_get_arg,
@@ -98,10 +137,17 @@ from swilite.core import (
     PL_put_string_nchars,
     PL_put_term,
     PL_put_variable,
+    PL_raise_exception,
     PL_record,
+    PL_record_external,
     PL_recorded,
+    PL_recorded_external,
     PL_register_atom,
+    PL_register_foreign_in_module,
+    PL_reset_term_refs,
     PL_rewind_foreign_frame,
+    PL_set_engine,
+    PL_skip_list,
     PL_term_type,
     PL_unify,
     PL_unify_arg,
@@ -116,12 +162,27 @@ from swilite.core import (
     PL_unify_list_nchars,
     PL_unify_nil,
     PL_unify_pointer,
+    PL_unify_stream,
     PL_unify_string_nchars,
     PL_unregister_atom,
     REP_UTF8,
+    SIO_FBUF,
+    SIO_INPUT,
+    SIO_OUTPUT,
+    SIO_RECORDPOS,
+    SIO_TEXT,
+    Sclose,
+    Sclose_function,
+    Sflush,
+    Snew,
+    Sread_function,
+    Ssetenc,
+    Swrite_function,
+    _PL_retry,
     atom_t,
     functor_t,
     module_t,
+    pl_function_va_t,
     state as prolog_state,
 )
 
@@ -138,26 +199,47 @@ _term_type_code_name = {
     PL_DICT: 'dict',
 }
 
+_skip_list_type_description = {
+    PL_PARTIAL_LIST: 'a partial list',
+    PL_CYCLIC_TERM: 'a cyclic list',
+    PL_NOT_A_LIST: 'not a list',
+}
+
 __all__ = [
     'Atom',
+    'Engine',
+    'EnginePool',
     'Frame',
     'Functor',
     'Module',
     'Predicate',
+    'PreparedCall',
     'PrologCallFailed',
     'PrologException',
+    'PrologExecutor',
     'PrologMemoryError',
+    'PrologProcessPool',
+    'Stream',
     'Query',
     'Term',
+    'TermArena',
     'TermList',
     'TermRecord',
+    'TermStore',
+    'assert_facts',
+    'consult_bytes',
+    'consult_string',
+    'foreign_predicate',
+    'load_csv',
+    'register_foreign',
+    'to_python',
 ]
 
 
 class PrologException(Exception):
     """An exception raised within the Prolog system."""
     def __init__(self, exception_term):
-        super().__init__()
+        super().__init__(exception_term)
         self.exception_term = exception_term
 
     def __str__(self):
@@ -184,6 +266,8 @@ class PrologMemoryError(Exception):
 
 class HandleWrapper(object):
     """Class wrapping a handle."""
+    __slots__ = ()
+
     def __init__(self, handle):
         self._handle = handle
 
@@ -214,15 +298,24 @@ class HandleWrapper(object):
 
 
 class TemporaryHandleMixIn(object):
-    """Mixin for `HandleWrapper` where the handle can be invalidated."""
+    """Mixin for `HandleWrapper` where the handle can be invalidated.
+
+    The handle is invalidated directly with `_invalidate` or, in O(1) for all
+    handles at once, by an owner (see `_bind`) advancing its generation.
+    """
     _valid = True
+    _owners = ()
 
     def __init__(self):
         super().__init__()
 
     def _get_handle(self):
         if self._valid:
-            return self.__handle
+            for owner, generation in self._owners:
+                if owner._generation != generation:
+                    break
+            else:
+                return self.__handle
         raise AttributeError('handle been invalidated')
 
     def _set_handle(self, handle):
@@ -234,12 +327,25 @@ class TemporaryHandleMixIn(object):
         """Invalidate the handle."""
         self._valid = False
 
+    def _bind(self, owner):
+        """Invalidate the handle once `owner` advances its generation.
+
+        The handle stays valid only while none of its owners has advanced.
+
+        Args:
+            owner: Object with an integer `_generation` attribute that is
+                incremented to invalidate all handles bound to it.
+        """
+        self._owners += ((owner, owner._generation),)
+
 
 class ConstantHandleToConstantMixIn(object):
     """`HandleWrapper` mixin where `_handle` is constant and refers to a
     constant object.
 
     """
+    __slots__ = ()
+
     def __hash__(self):
         return hash(self._handle)
 
@@ -249,11 +355,110 @@ def _decode_ptr_len_string(ptr, length, encoding='utf8'):
     return ptr[:length.value].decode(encoding)
 
 
+# Native struct format characters of buffers accepted as numeric lists.
+_INTEGER_BUFFER_FORMATS = frozenset('bBhHiIlLqQnN')
+_NUMERIC_BUFFER_FORMATS = _INTEGER_BUFFER_FORMATS | frozenset('fd')
+
+
+def _one_dimensional_view(buffer):
+    """A memoryview of `buffer`, which must be one-dimensional."""
+    view = memoryview(buffer)
+    if view.ndim != 1:
+        raise ValueError('Buffer must be one-dimensional.')
+    return view
+
+
+class _BoundedCache(object):
+    """A thread-safe least-recently-used mapping with a maximum size."""
+    def __init__(self, maxsize, on_evict=None):
+        """Create an empty cache.
+
+        Args:
+            maxsize (int)      : Maximum number of entries.
+            on_evict (callable): Called as ``on_evict(key, value)`` for each
+                entry dropped from the cache.
+        """
+        self.maxsize = maxsize
+        self._on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, create):
+        """The value cached for `key`.
+
+        On a miss, the value is created with ``create()`` and cached, evicting
+        the least recently used entry if the cache is full. The whole lookup
+        holds a lock, so concurrent misses on a key create a single value.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                pass
+            else:
+                self._entries.move_to_end(key)
+                return value
+            value = create()
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                old_key, old_value = self._entries.popitem(last=False)
+                if self._on_evict is not None:
+                    self._on_evict(old_key, old_value)
+            return value
+
+
+def _unregister_cached_atom(atom_handle, name):
+    if prolog_state.is_available:
+        PL_unregister_atom(atom_handle)
+
+# Atom names by atom handle.
+# Each cached atom is registered so that its handle cannot be garbage collected
+# and reused for a different name while it is in the cache.
+_atom_names = _BoundedCache(maxsize=65536, on_evict=_unregister_cached_atom)
+
+
+def _atom_handle_name(atom_handle):
+    """The name of an atom given its handle."""
+    return _atom_names.get(atom_handle,
+                           lambda: _register_atom_name(atom_handle))
+
+
+def _register_atom_name(atom_handle):
+    name = PL_atom_chars(atom_handle).decode()
+    PL_register_atom(atom_handle)
+    return name
+
+
 class Atom(HandleWrapper):
-    """Prolog Atom Interface"""
+    """Prolog Atom Interface
+
+    Atoms created by name are interned: recently used names map to a shared
+    `Atom` object. Atoms compare and hash by handle, which is unique to the
+    atom's name while the atom is registered.
+    """
+    _interned = _BoundedCache(maxsize=4096)
+
+    def __new__(cls, name=None):
+        if name is None:
+            # Called by `_from_handle`.
+            return super().__new__(cls)
+        return cls._interned.get(name, lambda: cls._new(name))
+
+    @classmethod
+    def _new(cls, name):
+        atom = super().__new__(cls)
+        HandleWrapper.__init__(atom, handle=PL_new_atom(name.encode()))
+        return atom
+
     def __init__(self, name):
-        """Create a named atom."""
-        super().__init__(handle=PL_new_atom(name.encode()))
+        """Create a named atom.
+
+        The atom is initialized by `__new__`, which returns the interned
+        `Atom` object if there is one for `name`.
+        """
 
     @classmethod
     def _from_handle(cls, handle):
@@ -279,33 +484,54 @@ class Atom(HandleWrapper):
     def __eq__(self, other):
         if type(other) is not type(self):
             return NotImplemented
-        # Atoms can have different handles but the same name.
-        return self.get_name() == other.get_name()
+        # Both atoms are registered so their handles are unique to their names.
+        return self._handle == other._handle
 
     def __hash__(self):
-        return hash(self.get_name())
+        return hash(self._handle)
 
     def get_name(self):
         """The atom's name as a string."""
-        return PL_atom_chars(self._handle).decode()
+        return _atom_handle_name(self._handle)
 
 
 class Functor(HandleWrapper, ConstantHandleToConstantMixIn):
-    """Prolog Functor Interface"""
+    """Prolog Functor Interface
+
+    Functors are cached by name and arity. Functor handles are unique to their
+    name and arity, so functors compare and hash by handle.
+    """
+    _cache = _BoundedCache(maxsize=4096)
+
+    def __new__(cls, name=None, arity=None):
+        if name is None:
+            # Called by `_from_handle`.
+            return super().__new__(cls)
+        return cls._cache.get((name, arity), lambda: cls._new(name, arity))
+
+    @classmethod
+    def _new(cls, name, arity):
+        try:
+            name_handle = name._handle
+        except AttributeError:
+            name_handle = Atom(name=name)._handle
+
+        functor = super().__new__(cls)
+        HandleWrapper.__init__(functor,
+                               handle=PL_new_functor(name_handle, arity))
+        return functor
+
     def __init__(self, name, arity):
         """Create a functor.
 
+        The functor is initialized by `__new__`, which returns the cached
+        `Functor` object if there is one for `name` and `arity`.
+
         Args:
             name (Atom): Name of the functor.
-                Either Atom object or string, the former is more efficient.
+                Either Atom object or string.
             arity (int): Arity of the functor.
         """
-        try:
-            name_handle = name._handle
-        except AttributeError:
-            name_handle = Atom(name=name)._handle
-
-        super().__init__(handle=PL_new_functor(name_handle, arity))
 
     def __str__(self):
         return "{name}/{arity}".format(name=self.get_name(),
@@ -318,11 +544,10 @@ class Functor(HandleWrapper, ConstantHandleToConstantMixIn):
     def __eq__(self, other):
         if type(other) is not type(self):
             return NotImplemented
-        return (self.get_name() == other.get_name() and
-                self.get_arity() == other.get_arity())
+        return self._handle == other._handle
 
     def __hash__(self):
-        return hash((self.get_name(), self.get_arity()))
+        return hash(self._handle)
 
     def __call__(self, *args):
         """Returns a new compound term created from this functor and `args`.
@@ -376,7 +601,14 @@ class Module(HandleWrapper, ConstantHandleToConstantMixIn):
 
 
 class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
-    """Prolog Predicate Interface"""
+    """Prolog Predicate Interface
+
+    Predicates compare and hash by handle.
+    The name, arity and module of a predicate are resolved when it is created.
+    """
+    __slots__ = ('_handle', '_name', '_arity', '_module')
+    _cache = _BoundedCache(maxsize=4096)
+
     def __init__(self, functor, module=None):
         """Create a predicate from a functor.
 
@@ -387,20 +619,32 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
         """
         super().__init__(
             handle=PL_pred(functor._handle, _get_nullable_handle(module)))
+        self._load_info()
+
+    @classmethod
+    def _from_handle(cls, handle):
+        """Create a Predicate object from an existing predicate handle."""
+        predicate = super()._from_handle(handle)
+        predicate._load_info()
+        return predicate
 
     @classmethod
     def from_name_arity(cls, name, arity, module_name=None):
         """Create a predicate directly from Python's built-in types.
 
+        Predicates created this way are cached by name, arity and module name.
+
         Args:
             name (str)       : Name of functor used to create the predicate.
             arity (int)      : Arity of functor used to create the predicate.
             module_name (str): Name of module containing the functor.
                 If ``None``, uses the current context module.
         """
-        return cls._from_handle(handle=PL_predicate(
-            name.encode(), arity,
-            module_name.encode() if module_name is not None else None))
+        return cls._cache.get(
+            (name, arity, module_name),
+            lambda: cls._from_handle(handle=PL_predicate(
+                name.encode(), arity,
+                module_name.encode() if module_name is not None else None)))
 
     def __str__(self):
         info = self.get_info()
@@ -417,15 +661,16 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
             module=info.module)
 
     def __eq__(self, other):
-            if type(other) is not type(self):
-                return NotImplemented
-            return self.get_info() == other.get_info()
+        if type(other) is not type(self):
+            return NotImplemented
+        # There is one predicate handle for each module and functor.
+        return self._handle == other._handle
 
     def __hash__(self):
-        return hash(self.get_info())
+        return hash(self._handle)
 
     def __call__(self, *arguments, arglist=None, goal_context_module=None,
-                 check=False):
+                 check=False, check_arguments=True):
         """Call predicate with arguments.
 
         Finds a binding for arguments that satisfies the predicate.
@@ -440,6 +685,9 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
                 If ``None``, the current context module is used, or ``user`` if
                 there is no context. This only matters for meta_predicates.
             check (bool)                : Check that the call succeeded.
+            check_arguments (bool)      : Check that the number of arguments
+                matches the predicate arity. Skip this in hot loops where the
+                arguments are known to match.
 
         Returns:
             bool: True if a binding for `arguments` was found.
@@ -452,7 +700,8 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
             arglist = TermList.from_terms(*arguments)
         elif arguments:
             raise ValueError('Cannot provide both "arguments" and "arglist".')
-        self.check_argument_match(arglist)
+        if check_arguments:
+            self.check_argument_match(arglist)
         success = bool(PL_call_predicate(
             _get_nullable_handle(goal_context_module),
             PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION,
@@ -463,22 +712,139 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
             raise PrologCallFailed(str(self))
         return success
 
-    Info = namedtuple('Info', ['name', 'arity', 'module'])
+    def prepare(self, goal_context_module=None):
+        """Prepare repeated calls of this predicate.
 
-    def get_info(self):
-        """Returns name, arity, and module of this predicate.
+        Args:
+            goal_context_module (Module): Context module of the goal.
+                If ``None``, the current context module is used, or ``user`` if
+                there is no context. This only matters for meta_predicates.
 
         Returns:
-            Predicate.Info:
+            PreparedCall: Callable reusing one preallocated argument list.
         """
+        return PreparedCall(self, goal_context_module=goal_context_module)
+
+    async def acall(self, *arguments, out=None, goal_context_module=None,
+                    executor=None):
+        """Call this predicate on a `PrologExecutor` thread.
+
+        Args:
+            *arguments                  : Python values converted as by
+                `Term.put_python`. Use ``None`` for output arguments.
+            out (int or tuple)          : Arguments to return. See `map`.
+            goal_context_module (Module): Context module of the goal.
+            executor (PrologExecutor)   : Executor making the call.
+                If ``None``, uses the default executor.
+
+        Returns:
+            If `out` is ``None``, whether the call succeeded. Otherwise the
+            value of the `out` arguments, or ``None`` if the call failed.
+
+        Raises:
+            TypeError      : If an argument contains a `Term`. Terms belong to
+                the engine of the calling thread and cannot be used on the
+                executor's engine; pass Python values instead.
+            PrologException: If the call raised an exception in Prolog. The
+                `exception_term` is the text of the Prolog exception term.
+        """
+        if any(_contains_term(argument) for argument in arguments):
+            raise TypeError('Arguments of acall cannot contain Term objects.')
+        if executor is None:
+            executor = _get_default_executor()
+        results = await executor.run(
+            _detached_map, self, [arguments], out, goal_context_module)
+        return results[0]
+
+    def map(self, rows, out=None, goal_context_module=None):
+        """Call this predicate once for each row of arguments.
+
+        All calls run inside a single frame that is rewound between rows, so
+        no terms or bindings outlive the row that created them.
+
+        Args:
+            rows (iterable)             : Argument tuples. Values are converted
+                as by `Term.put_python`. Use ``None`` for output arguments.
+            out (int or tuple)          : Index or indices of the arguments to
+                extract (as by `Term.to_python`) after each successful call.
+                If ``None``, only success flags are returned.
+            goal_context_module (Module): Context module of the goal.
+                If ``None``, the current context module is used, or ``user`` if
+                there is no context. This only matters for meta_predicates.
+
+        Returns:
+            list: One entry per row. If `out` is ``None``, a bool indicating
+                success. If `out` is an int, the value of that argument.
+                If `out` is a tuple, a tuple of argument values.
+                The entry is ``None`` for rows where the call failed.
+
+        Raises:
+            ValueError     : If a row does not match the predicate arity.
+            PrologException: If a call raised an exception in Prolog.
+                The remaining rows are not called.
+        """
+        arity = self._arity
+        predicate_handle = self._handle
+        module_handle = _get_nullable_handle(goal_context_module)
+        flags = PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION
+        functor_handles = {}
+        results = []
+        exception = None
+        with Frame(discard=True) as frame:
+            for row in rows:
+                if len(row) != arity:
+                    self.check_argument_match(row)
+                arguments = PL_new_term_refs(arity)
+                for i, value in enumerate(row):
+                    _put_python(arguments + i, value, functor_handles)
+
+                query = PL_open_query(
+                    module_handle, flags, predicate_handle, arguments)
+                success = PL_next_solution(query)
+                if not success:
+                    exception_term = PL_exception(query)
+                    if exception_term:
+                        # Keep the exception past the frame discard.
+                        exception = TermRecord(
+                            Term._from_handle(exception_term))
+                PL_cut_query(query)
+                if exception is not None:
+                    break
+                if out is None:
+                    results.append(bool(success))
+                elif not success:
+                    results.append(None)
+                elif isinstance(out, int):
+                    results.append(_term_handle_to_python(arguments + out))
+                else:
+                    results.append(tuple(_term_handle_to_python(arguments + i)
+                                         for i in out))
+                frame.rewind()
+        if exception is not None:
+            raise PrologException(exception.get())
+        return results
+
+    Info = namedtuple('Info', ['name', 'arity', 'module'])
+
+    def _load_info(self):
         name = atom_t()
         arity = c_int()
         module = module_t()
         PL_predicate_info(self._handle,
                           byref(name), byref(arity), byref(module))
-        return self.Info(name=Atom._from_handle(name.value),
-                         arity=arity.value,
-                         module=Module._from_handle(module.value))
+        self._name = Atom._from_handle(name.value)
+        self._arity = arity.value
+        self._module = Module._from_handle(module.value)
+
+    def get_info(self):
+        """Returns name, arity, and module of this predicate.
+
+        Returns:
+            Predicate.Info:
+        """
+        return self.Info(name=self._name,
+                         arity=self._arity,
+                         module=self._module)
 
     def check_argument_match(self, arguments):
         """Check that the right number of arguments are given.
@@ -491,7 +857,7 @@ class Predicate(HandleWrapper, ConstantHandleToConstantMixIn):
                 the predicate's arity.
         """
         number_of_arguments = len(arguments)
-        arity = self.get_info().arity
+        arity = self._arity
         if number_of_arguments != arity:
             raise ValueError(
                 ('number of arguments ({nargs}) does not match '
@@ -508,7 +874,26 @@ class Term(HandleWrapper):
 
     def __init__(self):
         """Initialize a new term. The term is initially a variable."""
+        # Within a `TermArena`, new terms are temporary and owned by the arena.
+        arena = TermArena._current()
+        if arena is not None and type(self) is Term:
+            self.__class__ = TemporaryTerm
         super().__init__(handle=PL_new_term_ref())
+        if arena is not None:
+            arena._register(self)
+
+    @classmethod
+    def _from_handle(cls, handle):
+        # Wrappers of references allocated within a `TermArena` are temporary
+        # and owned by the arena, like constructed terms.
+        arena = TermArena._owner_of(handle)
+        if arena is None:
+            return super()._from_handle(handle)
+        if cls is Term:
+            return TemporaryTerm._from_handle(handle)
+        term = super()._from_handle(handle)
+        arena._register(term)
+        return term
 
     def __str__(self):
         """A Prolog string representing this term."""
@@ -545,10 +930,18 @@ class Term(HandleWrapper):
         """Float representation of this term (if it stores a float)."""
         return self.get_float()
 
+    def __copy__(self):
+        """A new `Term` object referencing the same term."""
+        return self._from_handle(self._handle)
+
     def __deepcopy__(self, memo):
         """Creates a new Prolog term, copied from the old."""
         return self.from_term(self)
 
+    def __reduce__(self):
+        """Pickle support using the binary encoding of `to_bytes`."""
+        return (Term.from_bytes, (self.to_bytes(),))
+
     def type(self):
         """Term type as a string.
 
@@ -881,6 +1274,203 @@ class Term(HandleWrapper):
         self._require_success(
             PL_get_nil(self._handle))
 
+    def get_list_length(self):
+        """The length of the list represented by this term.
+
+        The list is traversed by Prolog, without creating any term references.
+
+        Raises:
+            TypeError: If this term is not a proper list, i.e. it is a partial
+                list, a cyclic list, or not a list at all.
+        """
+        length = c_size_t()
+        list_type = PL_skip_list(self._handle, None, byref(length))
+        if list_type != PL_LIST:
+            raise TypeError('Term is {}.'.format(
+                _skip_list_type_description[list_type]))
+        return length.value
+
+    def get_list_item(self, index):
+        """A new term referencing an element of the list represented by this
+        term.
+
+        Args:
+            index (int): Index of the element. Negative indices count from the
+                end of the list.
+
+        Raises:
+            IndexError: If `index` is out of bounds.
+            TypeError : If this term is not a proper list.
+        """
+        length = self.get_list_length()
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('list index out of range')
+
+        item = Term.from_term(self)
+        for _ in range(index):
+            PL_get_tail(item._handle, item._handle)
+        PL_get_head(item._handle, item._handle)
+        return item
+
+    def iter_list(self):
+        """Iterate over the elements of the list represented by this term.
+
+        A single pair of term references is used for the whole iteration.
+
+        Yields:
+            TemporaryTerm: The current element of the list. It is invalidated
+                when the next element is requested.
+
+        Raises:
+            TypeError: If this term is not a proper list.
+                Raised immediately, before any element is yielded.
+        """
+        self.get_list_length()
+        return self._iter_list()
+
+    def _iter_list(self):
+        head = PL_new_term_refs(2)
+        tail = head + 1
+        PL_put_term(tail, self._handle)
+        element = None
+        while PL_get_list(tail, head, tail):
+            if element is not None:
+                element._invalidate()
+            element = TemporaryTerm._from_handle(head)
+            yield element
+        if element is not None:
+            element._invalidate()
+
+    def get_int_list(self):
+        """The value of this term as an ``array.array('q')``, if it is a list
+        of integers or int-compatible floats.
+
+        The list is transferred as a single block of text rather than
+        one API call per element.
+        """
+        length = self.get_list_length()
+        if not length:
+            return array('q')
+        text = self._format_list_elements("integer(X), format('~d,', [X])")
+        if text is not None:
+            try:
+                values = array('q', map(int, text.split(',')[:-1]))
+            except (ValueError, OverflowError):
+                pass
+            else:
+                if len(values) == length:
+                    return values
+        return self._get_number_list_elementwise(
+            array('q'), PL_get_int64, c_int64, 'integers')
+
+    def get_float_list(self):
+        """The value of this term as an ``array.array('d')``, if it is a list
+        of floats or integers.
+
+        The list is transferred as a single block of text rather than
+        one API call per element.
+        """
+        length = self.get_list_length()
+        if not length:
+            return array('d')
+        text = self._format_list_elements(
+            "number(X), F is float(X), format('~17g,', [F])")
+        if text is not None:
+            try:
+                values = array('d', map(float, text.split(',')[:-1]))
+            except ValueError:
+                pass
+            else:
+                if len(values) == length:
+                    return values
+        return self._get_number_list_elementwise(
+            array('d'), PL_get_float, c_double, 'floats')
+
+    def _format_list_elements(self, element_goal):
+        """Collect the output of `element_goal` for each element ``X`` of this
+        list.
+
+        The elements are written with explicit ``format/2`` directives so that
+        the text does not depend on flags such as ``float_format``.
+
+        Returns:
+            str: The concatenated output, or ``None`` if `element_goal` failed
+                for some element.
+        """
+        with Frame(discard=True):
+            goal = Term.from_parsed(
+                'with_output_to(string(S), forall(member(X, L), ({})))'.format(
+                    element_goal))
+            if not (goal.get_arg(1).get_arg(0).get_arg(1).unify(self) and
+                    goal()):
+                return None
+            return goal.get_arg(0).get_arg(0).get_string_chars()
+
+    def _get_number_list_elementwise(self, values, get_function, value_type,
+                                     type_name):
+        """Append the elements of this list to `values` one at a time.
+
+        Used when the elements cannot be read back from the text of the list
+        (e.g. non-finite floats).
+        """
+        head = PL_new_term_refs(2)
+        tail = head + 1
+        value = value_type()
+        try:
+            PL_put_term(tail, self._handle)
+            while PL_get_list(tail, head, tail):
+                if not get_function(head, byref(value)):
+                    raise TypeError(
+                        'Term is not a list of {}.'.format(type_name))
+                values.append(value.value)
+        finally:
+            PL_reset_term_refs(head)
+        return values
+
+    def to_python(self):
+        """Convert this term into nested Python values.
+
+        The conversion is:
+
+            * integer      -> ``int``
+            * float        -> ``float``
+            * atom, string -> ``str``
+            * nil, list    -> ``list``
+            * compound     -> ``tuple`` of ``(name, arg1, ..., argN)``
+            * variable     -> ``None``
+
+        Lists that are not properly terminated by nil are converted as
+        compound terms using the ``[|]`` functor.
+
+        The term is traversed iteratively using a small pool of term
+        references that are released once the conversion is complete.
+
+        Raises:
+            TypeError : If the term contains a blob or dict.
+            ValueError: If the term is cyclic.
+        """
+        return _term_handle_to_python(self._handle)
+
+    def to_bytes(self):
+        """Serialize this term in SWI-Prolog's external record format.
+
+        The encoding is binary, preserves variable sharing within the term and
+        can be restored with `Term.from_bytes` in another Prolog process.
+
+        Returns:
+            bytes: The external record of this term.
+        """
+        size = c_size_t()
+        record = PL_record_external(self._handle, byref(size))
+        if not record:
+            raise PrologMemoryError()
+        try:
+            return record[:size.value]
+        finally:
+            PL_erase_external(record)
+
     def put_variable(self):
         """Put a fresh variable in this term, resetting it to its initial state.
         """
@@ -971,14 +1561,103 @@ class Term(HandleWrapper):
         self._require_success(
             PL_put_nil(self._handle))
 
+    def put_int_list(self, buffer):
+        """Put a list of integers in this term.
+
+        The list is transferred as a single block of text rather than
+        one API call per element.
+
+        Args:
+            buffer: A one-dimensional object supporting the buffer protocol
+                with an integer format, e.g. ``array.array('q')``.
+        """
+        view = _one_dimensional_view(buffer)
+        if view.format not in _INTEGER_BUFFER_FORMATS:
+            raise TypeError('Buffer format {!r} is not an integer format.'
+                            .format(view.format))
+        self.put_parsed('[{}]'.format(','.join(map(str, view.tolist()))))
+
+    def put_float_list(self, buffer):
+        """Put a list of floats in this term.
+
+        Finite values are transferred as a single block of text rather than
+        one API call per element.
+
+        Args:
+            buffer: A one-dimensional object supporting the buffer protocol
+                with a numeric format, e.g. ``array.array('d')``.
+        """
+        view = _one_dimensional_view(buffer)
+        if view.format not in _NUMERIC_BUFFER_FORMATS:
+            raise TypeError('Buffer format {!r} is not a numeric format.'
+                            .format(view.format))
+        values = [float(value) for value in view.tolist()]
+        if all(map(math.isfinite, values)):
+            # 17 significant digits are enough to represent any double
+            # exactly.
+            self.put_parsed('[{}]'.format(
+                ','.join(map('{:.16e}'.format, values))))
+            return
+
+        head = PL_new_term_refs(2)
+        tail = head + 1
+        PL_put_nil(tail)
+        for value in reversed(values):
+            PL_put_float(head, value)
+            self._require_success(
+                PL_cons_list(tail, head, tail))
+        PL_put_term(self._handle, tail)
+        PL_reset_term_refs(head)
+
     def put_term(self, term):
         """Set this term to reference the new term."""
         PL_put_term(self._handle, term._handle)
 
+    def put_python(self, value):
+        """Put a term constructed from nested Python values in this term.
+
+        The conversion is:
+
+            * `Term`  -> the referenced term
+            * ``None``  -> a fresh variable
+            * ``bool``  -> the atom ``true`` or ``false``
+            * ``int``   -> integer
+            * ``float`` -> float
+            * ``str``   -> atom
+            * ``list``  -> list
+            * ``dict``  -> list of ``Key-Value`` pairs
+            * ``tuple`` -> compound term, given as
+              ``(functor, arg1, ..., argN)`` where ``functor`` is either a
+              name (``str`` or `Atom`) or a `Functor` of arity ``N``.
+
+        The term is built bottom-up. The arguments of each compound term are
+        allocated as a single block of term references, which is released as
+        soon as the compound term has been constructed.
+
+        Raises:
+            TypeError: If a value cannot be converted.
+        """
+        _put_python(self._handle, value, {})
+
+    def put_bytes(self, data):
+        """Put a term serialized by `to_bytes` in this term.
+
+        Args:
+            data (bytes): External record of a term.
+
+        Warning:
+            `data` must have been created by `to_bytes`. Prolog does not
+            validate external records, so arbitrary data may crash the process.
+        """
+        self._require_success(PL_recorded_external(
+            cast(bytes(data), POINTER(c_char)), self._handle))
+
     @classmethod
     def from_term(cls, term):
         """Create a new term as a copy of an existing one."""
-        return cls._from_handle(handle=PL_copy_term_ref(term._handle))
+        new_term = cls()
+        PL_put_term(new_term._handle, term._handle)
+        return new_term
 
     def put_parsed(self, string):
         """Parse `string` as Prolog and place the result in this term.
@@ -1037,21 +1716,44 @@ class Term(HandleWrapper):
             PL_cons_list(self._handle, head._handle, tail._handle))
 
     def put_list_terms(self, terms):
-        """Set this term to a list constructed from a list of terms.
+        """Set this term to a list constructed from an iterable of terms.
+
+        Runs in linear time and uses a constant number of term references
+        regardless of the length of the list. `terms` is not modified.
 
         Args:
-            terms (list): A (python) list of terms.
+            terms (iterable): Terms forming the elements of the list.
+                Reversible sequences (e.g. ``list`` or ``tuple``) are consed
+                from the end, other iterables are consumed in a single
+                forward pass.
         """
         try:
-            head = terms.pop(0)
-        except IndexError:
-            self.put_nil()
+            reversed_terms = reversed(terms)
+        except TypeError:
+            self._put_list_terms_forward(terms)
             return
 
-        tail = Term.from_nil()
-        while terms:
-            tail = Term.from_cons_list(terms.pop(), tail)
-        self.put_cons_list(head, tail)
+        tail = PL_new_term_ref()
+        PL_put_nil(tail)
+        for term in reversed_terms:
+            self._require_success(
+                PL_cons_list(tail, term._handle, tail))
+        PL_put_term(self._handle, tail)
+
+    def _put_list_terms_forward(self, terms):
+        """Set this term to a list built from the front of `terms`."""
+        list_ = PL_new_term_refs(3)
+        tail = list_ + 1
+        head = list_ + 2
+        PL_put_term(tail, list_)
+        for term in terms:
+            self._require_success(
+                PL_unify_list(tail, head, tail))
+            self._require_success(
+                PL_unify(head, term._handle))
+        self._require_success(
+            PL_unify_nil(tail))
+        PL_put_term(self._handle, list_)
 
     def __call__(self, context_module=None, check=False):
         """Call term like once(term).
@@ -1211,6 +1913,278 @@ class Term(HandleWrapper):
         return bool(PL_unify_arg(index + 1, self._handle, arg._handle))
 
 
+def to_python(term):
+    """Convert `term` into nested Python values. See `Term.to_python`."""
+    return term.to_python()
+
+
+class _TermRefPool(object):
+    """A pool of reusable term references.
+
+    References are allocated on demand and recycled with `release`.
+    All references allocated by the pool are freed together by `close`, so
+    term references created by other code while the pool is open are freed
+    as well.
+    """
+    def __init__(self):
+        self._first_handle = None
+        self._free_handles = []
+
+    def acquire(self):
+        """A term reference from the pool."""
+        if self._free_handles:
+            return self._free_handles.pop()
+        handle = PL_new_term_ref()
+        if self._first_handle is None:
+            self._first_handle = handle
+        return handle
+
+    def release(self, handle):
+        """Return `handle` to the pool for reuse."""
+        self._free_handles.append(handle)
+
+    def close(self):
+        """Free all term references allocated by the pool."""
+        if self._first_handle is not None:
+            PL_reset_term_refs(self._first_handle)
+        self._first_handle = None
+        self._free_handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+def _atomic_handle_to_python(handle, type_code):
+    """Convert a non-compound term reference into a Python value."""
+    if type_code == PL_INTEGER:
+        i = c_int64()
+        if PL_get_int64(handle, byref(i)):
+            return i.value
+        # Does not fit in 64 bits.
+        return int(Term._from_handle(handle).get_chars())
+    if type_code == PL_FLOAT:
+        f = c_double()
+        Term._require_success_expecting_type(
+            PL_get_float(handle, byref(f)), 'float')
+        return f.value
+    if type_code == PL_ATOM:
+        a = atom_t()
+        Term._require_success_expecting_type(
+            PL_get_atom(handle, byref(a)), 'atom')
+        return _atom_handle_name(a.value)
+    if type_code == PL_STRING:
+        # PL_get_string_chars fails for wide strings and gives ISO Latin-1
+        # text otherwise, so the string is converted to UTF-8 explicitly.
+        s = POINTER(c_char)()
+        length = c_size_t()
+        Term._require_success_expecting_type(
+            PL_get_nchars(handle, byref(length), byref(s),
+                          CVT_STRING | REP_UTF8 | BUF_DISCARDABLE),
+            'string')
+        return _decode_ptr_len_string(s, length)
+    if type_code == PL_NIL:
+        return []
+    if type_code == PL_VARIABLE:
+        return None
+    raise TypeError('Cannot convert a {} term to a Python value.'.format(
+        _term_type_code_name[type_code]))
+
+
+def _term_handle_to_python(handle):
+    """Convert the term referenced by `handle` into nested Python values.
+
+    See `Term.to_python`.
+    """
+    if not PL_is_acyclic(handle):
+        raise ValueError('Cannot convert a cyclic term.')
+
+    root_values = []
+    # Each stack entry is [values, handle, next_arg, arity, owned, cells] for a
+    # compound term being converted. Entries for proper lists have an arity of
+    # None and their handle refers to the unconverted tail of the list.
+    # `owned` is True if the handle belongs to the pool.
+    # For the cells of a partial list, `cells` is the number of list cells that
+    # follow, so that PL_skip_list runs only once per partial list.
+    stack = []
+    length = c_size_t()
+    name = atom_t()
+    arity = c_int()
+    with _TermRefPool() as pool:
+        pending = handle
+        pending_owned = False
+        pending_cells = None
+        while True:
+            if pending is not None:
+                type_code = PL_term_type(pending)
+                cells = None
+                if type_code == PL_LIST_PAIR:
+                    if pending_cells is not None:
+                        cells = pending_cells - 1
+                    elif PL_skip_list(pending, None,
+                                      byref(length)) != PL_LIST:
+                        cells = length.value - 1
+                if type_code == PL_LIST_PAIR and cells is None:
+                    if pending_owned:
+                        tail = pending
+                    else:
+                        tail = pool.acquire()
+                        PL_put_term(tail, pending)
+                    stack.append([[], tail, None, None, True, None])
+                elif type_code in (PL_TERM, PL_LIST_PAIR):
+                    PL_get_compound_name_arity(pending, byref(name),
+                                               byref(arity))
+                    stack.append([[_atom_handle_name(name.value)], pending,
+                                  1, arity.value, pending_owned, cells])
+                else:
+                    value = _atomic_handle_to_python(pending, type_code)
+                    if pending_owned:
+                        pool.release(pending)
+                    (stack[-1][0] if stack else root_values).append(value)
+                pending = None
+                pending_cells = None
+
+            if not stack:
+                break
+
+            entry = stack[-1]
+            values, entry_handle, next_arg, entry_arity, owned, cells = entry
+            if entry_arity is None:
+                head = pool.acquire()
+                if PL_get_list(entry_handle, head, entry_handle):
+                    pending = head
+                    pending_owned = True
+                    continue
+                pool.release(head)
+                value = values
+            elif next_arg <= entry_arity:
+                arg = pool.acquire()
+                PL_get_arg(next_arg, entry_handle, arg)
+                entry[2] = next_arg + 1
+                pending = arg
+                pending_owned = True
+                if next_arg == 2 and cells:
+                    # The tail is the next cell of the same partial list.
+                    pending_cells = cells
+                continue
+            else:
+                value = tuple(values)
+
+            if owned:
+                pool.release(entry_handle)
+            stack.pop()
+            (stack[-1][0] if stack else root_values).append(value)
+
+    return root_values[0]
+
+
+def _put_python(handle, value, functor_handles):
+    """Put a term constructed from `value` in the term referenced by `handle`.
+
+    See `Term.put_python`.
+
+    Args:
+        handle (int)         : Term reference to put the value in.
+        value                : Python value to convert.
+        functor_handles(dict): Cache of functor handles by (name, arity).
+    """
+    if isinstance(value, Term):
+        PL_put_term(handle, value._handle)
+    elif value is None:
+        PL_put_variable(handle)
+    elif isinstance(value, bool):
+        PL_put_bool(handle, int(value))
+    elif isinstance(value, int):
+        if -2**63 <= value < 2**63:
+            PL_put_int64(handle, value)
+        elif not PL_chars_to_term(str(value).encode(), handle):
+            raise PrologMemoryError()
+    elif isinstance(value, float):
+        PL_put_float(handle, value)
+    elif isinstance(value, str):
+        encoded_value = value.encode()
+        PL_put_atom_nchars(handle, len(encoded_value), encoded_value)
+    elif isinstance(value, tuple):
+        _put_python_compound(handle, value, functor_handles)
+    elif isinstance(value, list):
+        _put_python_list(handle, value, _put_python, functor_handles)
+    elif isinstance(value, dict):
+        _put_python_list(handle,
+                         [('-', key, val) for key, val in value.items()],
+                         _put_python, functor_handles)
+    else:
+        raise TypeError('Cannot convert {} to a Prolog term.'.format(
+            type(value).__name__))
+
+
+def _contains_term(value):
+    """Whether a Python value accepted by `Term.put_python` contains a `Term`.
+    """
+    if isinstance(value, Term):
+        return True
+    elif isinstance(value, (tuple, list)):
+        return any(_contains_term(element) for element in value)
+    elif isinstance(value, dict):
+        return any(_contains_term(key) or _contains_term(val)
+                   for key, val in value.items())
+    return False
+
+
+def _put_python_compound(handle, value, functor_handles):
+    """Put a compound term constructed from the tuple `value` in `handle`."""
+    if not value:
+        raise TypeError('Compound term tuples must start with a functor.')
+    functor = value[0]
+    arity = len(value) - 1
+    if isinstance(functor, Functor):
+        functor_arity = functor.get_arity()
+        if functor_arity != arity:
+            raise TypeError(
+                ('Functor arity ({arity}) does not match '
+                 'number of arguments ({nargs}).').format(
+                     arity=functor_arity, nargs=arity))
+        functor_handle = functor._handle
+    else:
+        key = (functor, arity)
+        try:
+            functor_handle = functor_handles[key]
+        except KeyError:
+            functor_handle = Functor(functor, arity)._handle
+            functor_handles[key] = functor_handle
+
+    if arity == 0:
+        PL_put_functor(handle, functor_handle)
+        return
+
+    args_handle = PL_new_term_refs(arity)
+    for i in range(arity):
+        _put_python(args_handle + i, value[i + 1], functor_handles)
+    success = PL_cons_functor_v(handle, functor_handle, args_handle)
+    PL_reset_term_refs(args_handle)
+    if not success:
+        raise PrologMemoryError()
+
+
+def _put_python_list(handle, values, put_element, *args):
+    """Put a list constructed from the sequence `values` in `handle`.
+
+    Each element is put with ``put_element(element_handle, value, *args)``,
+    e.g. `_put_python`.
+    """
+    head = PL_new_term_refs(2)
+    tail = head + 1
+    PL_put_nil(tail)
+    for value in reversed(values):
+        put_element(head, value, *args)
+        if not PL_cons_list(tail, head, tail):
+            PL_reset_term_refs(head)
+            raise PrologMemoryError()
+    PL_put_term(handle, tail)
+    PL_reset_term_refs(head)
+
+
 def _add_from_method_to_class(klass, put_method_name, put_method):
     suffix = put_method_name[4:]
     from_method_name = 'from_' + suffix
@@ -1258,8 +2232,14 @@ class TermList(HandleWrapper):
     Required by `Term.cons_functor_v` and `Query`.
     """
     def __init__(self, length):
+        # Within a `TermArena`, new term lists are temporary and owned by it.
+        arena = TermArena._current()
+        if arena is not None and type(self) is TermList:
+            self.__class__ = TemporaryTermList
         self._length = length
         super().__init__(handle=PL_new_term_refs(length))
+        if arena is not None:
+            arena._register(self)
 
     @classmethod
     def from_terms(cls, *terms):
@@ -1294,26 +2274,108 @@ class TermList(HandleWrapper):
             raise IndexError()
 
 
-class Query():
-    """Prolog Query Context Manager."""
-    _call_predicate = Predicate.from_name_arity('call', 1)
-
-    def __init__(self, predicate, *arguments, arglist=None,
-                 goal_context_module=None):
-        """Prepare a query.
+class PreparedCall(object):
+    """Repeated call of a predicate with a preallocated argument list.
 
-        A query consists of a predicate (`predicate`) and a list of arguments
-        (`arguments`). Each solution is an assignment to variables in
-        `arguments` that satisfies the predicate.
+    The argument terms are allocated once. Each call overwrites them in place
+    with the new arguments so that steady-state calls allocate no term
+    references. Output arguments are read from `arglist` after the call and
+    are only valid until the next call.
 
-        A query behaves statefully. The solutions must be read from
-        `arguments`.
+    Attributes:
+        predicate (Predicate)       : Predicate to call.
+        arglist (TermList)          : Argument terms of the most recent call.
+        goal_context_module (Module): Context module of the goal.
+    """
+    def __init__(self, predicate, goal_context_module=None):
+        """Prepare calls of `predicate`.
 
         Args:
-            predicate (Predicate)       : Predicate to query.
-            *arguments (Term)           : Terms to pass as arguments to
-                `predicate`.
-            arglist (TermList)          : List of argument terms to
+            predicate (Predicate)       : Predicate to call.
+            goal_context_module (Module): Context module of the goal.
+                If ``None``, the current context module is used, or ``user`` if
+                there is no context. This only matters for meta_predicates.
+        """
+        self.predicate = predicate
+        self.arglist = TermList(predicate.get_info().arity)
+        self.goal_context_module = goal_context_module
+        self._functor_handles = {}
+
+    def __repr__(self):
+        return ('PreparedCall(predicate={predicate!r}, '
+                'goal_context_module={module!r})').format(
+                    predicate=self.predicate,
+                    module=self.goal_context_module)
+
+    def __call__(self, *arguments, check=False):
+        """Call the predicate with `arguments`.
+
+        Args:
+            *arguments: Python values or terms, converted as by
+                `Term.put_python`. Pass ``None`` for an output argument.
+            check (bool): Check that the call succeeded.
+
+        Returns:
+            bool: True if the call succeeded.
+
+        Raises:
+            ValueError      : If the number of arguments does not match the
+                predicate arity.
+            PrologCallFailed: If the call failed and `check` is ``True``.
+        """
+        arglist = self.arglist
+        if len(arguments) != len(arglist):
+            self.predicate.check_argument_match(arguments)
+        handle = arglist._handle
+        functor_handles = self._functor_handles
+        for i, value in enumerate(arguments):
+            _put_python(handle + i, value, functor_handles)
+
+        success = bool(PL_call_predicate(
+            _get_nullable_handle(self.goal_context_module),
+            PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION,
+            self.predicate._handle,
+            handle))
+
+        if check and not success:
+            raise PrologCallFailed(str(self.predicate))
+        return success
+
+
+class TemporaryTermList(TermList, TemporaryHandleMixIn):
+    def __getitem__(self, key):
+        """A `TemporaryTerm` invalidated together with this list."""
+        if isinstance(key, int) and key >= 0 and key < self._length:
+            term = TemporaryTerm._from_handle(self._handle + key)
+            term._owners = self._owners
+            return term
+        else:
+            raise IndexError()
+
+
+class Query():
+    """Prolog Query Context Manager."""
+    _call_predicate = Predicate.from_name_arity('call', 1)
+    _findall_predicate = Predicate.from_name_arity('findall', 3)
+    _module_qualifier_functor = Functor(':', 2)
+    _context_functor = Functor('@', 2)
+
+    def __init__(self, predicate, *arguments, arglist=None,
+                 goal_context_module=None):
+        """Prepare a query.
+
+        A query consists of a predicate (`predicate`) and a list of arguments
+        (`arguments`). Each solution is an assignment to variables in
+        `arguments` that satisfies the predicate.
+
+        A query behaves statefully. The solutions must be read from
+        `arguments`.
+
+        Args:
+            predicate (Predicate)       : Predicate to query.
+            *arguments (Term)           : Terms to pass as arguments to
+                `predicate`.
+            arglist (TermList)          : List of argument terms to
                 `predicate`. Cannot pass both arguments and arglist.
             goal_context_module (Module): Context module of the goal.
                 If ``None``, the current context module is used, or ``user`` if
@@ -1393,6 +2455,120 @@ class Query():
         else:
             yield from self._term_assignments_temporary(term)
 
+    def collect(self, template):
+        """The value of a template under every solution to the query.
+
+        All solutions are collected in Prolog with ``findall/3`` and converted
+        to Python in a single pass, instead of backtracking into Prolog from
+        Python once per solution.
+
+        Args:
+            template (Term): Term whose value is collected for each solution.
+                Typically shares variables with the query arguments.
+
+        Returns:
+            list: The value of `template` for each solution, converted as by
+                `Term.to_python`.
+
+        Raises:
+            PrologException: If an exception was raised in Prolog.
+        """
+        with Frame(discard=True) as frame:
+            results = frame.term()
+            query = Query(self._findall_predicate,
+                          template, self._qualified_goal(frame), results,
+                          goal_context_module=self.goal_context_module)
+            with query as active_query:
+                active_query.next_solution()
+                return results.to_python()
+
+    async def asolutions(self, template, executor=None, max_pending=16):
+        """Asynchronously iterate over the value of a template under each
+        solution to the query.
+
+        The query is solved on a `PrologExecutor` thread so that the event loop
+        is never blocked by Prolog. The query and template are copied to the
+        executor's engine, so solutions are yielded as Python values
+        (see `Term.to_python`).
+
+        >>> async for x in Query.call_term(goal).asolutions(X):
+        ...     print(x)
+
+        Args:
+            template (Term)          : Term whose value is yielded for each
+                solution. Typically shares variables with the query arguments.
+            executor (PrologExecutor): Executor solving the query.
+                If ``None``, uses the default executor.
+            max_pending (int)        : Maximum number of solutions found ahead
+                of the consumer.
+
+        Yields:
+            The value of `template` for each solution.
+
+        Raises:
+            PrologException: If an exception was raised in Prolog. The
+                `exception_term` is the text of the Prolog exception term.
+
+        Note:
+            The query occupies one executor thread until the iteration ends.
+        """
+        if executor is None:
+            executor = _get_default_executor()
+        with Frame(discard=True) as frame:
+            task = frame.term()
+            task.put_cons_functor(_pool_task_functor,
+                                  template, self._qualified_goal(frame))
+            data = task.to_bytes()
+
+        loop = asyncio.get_running_loop()
+        solutions = asyncio.Queue()
+        permits = threading.Semaphore(max_pending)
+        stop = threading.Event()
+
+        def emit(kind, value):
+            loop.call_soon_threadsafe(solutions.put_nowait, (kind, value))
+
+        await executor._asubmit(_produce_solutions, data,
+                                self.goal_context_module, emit, permits, stop)
+        try:
+            while True:
+                kind, value = await solutions.get()
+                if kind == 'solution':
+                    yield value
+                    permits.release()
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            stop.set()
+            permits.release()
+
+    def _qualified_goal(self, frame):
+        """The query as a ``@(Module:Goal, Context)`` term created in `frame`.
+
+        ``Module`` is the module defining the predicate, as used by
+        ``PL_open_query``, and ``Context`` is the goal context module, which
+        meta-predicates such as ``call/1`` use to resolve their arguments.
+        """
+        info = self.predicate.get_info()
+        goal = frame.term()
+        goal.put_cons_functor_v(Functor(info.name, info.arity), self.arglist)
+        module = frame.term()
+        module.put_atom(info.module.get_name())
+        qualified_goal = frame.term()
+        qualified_goal.put_cons_functor(self._module_qualifier_functor,
+                                        module, goal)
+        context_module = self.goal_context_module
+        if context_module is None:
+            context_module = Module.current_context()
+        context = frame.term()
+        context.put_atom(context_module.get_name())
+        context_goal = frame.term()
+        context_goal.put_cons_functor(self._context_functor,
+                                      qualified_goal, context)
+        return context_goal
+
     def _term_assignments_persistent(self, term):
         with self as active_query:
             while active_query.next_solution():
@@ -1423,7 +2599,7 @@ class _ActiveQuery(HandleWrapper, TemporaryHandleMixIn):
             PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION,
             query.predicate._handle,
             query.arglist._handle))
-        self._bound_temporary_terms = []
+        self._generation = 0
 
     def next_solution(self):
         """Find the next solution, updating `arglist`.
@@ -1444,7 +2620,7 @@ class _ActiveQuery(HandleWrapper, TemporaryHandleMixIn):
         Use `TermRecord` to persist terms across backtracks.
         """
         success = bool(PL_next_solution(self._handle))
-        self._invalidate_bound_temporary_terms()
+        self._generation += 1
         if not success:
             exception_term = PL_exception(self._handle)
             if exception_term:
@@ -1459,17 +2635,13 @@ class _ActiveQuery(HandleWrapper, TemporaryHandleMixIn):
         Args:
             term (TemporaryTerm): Temporary term to bind.
         """
-        self._bound_temporary_terms.append(term)
-
-    def _invalidate_bound_temporary_terms(self):
-        for term in self._bound_temporary_terms:
-            term._invalidate()
-        self._bound_temporary_terms = []
+        term._bind(self)
 
     def close(self):
         """Close the query and destroy all data and bindings associated with it.
         """
         PL_close_query(self._handle)
+        self._generation += 1
         self._invalidate()
 
     def __str__(self):
@@ -1513,10 +2685,135 @@ class TermRecord(HandleWrapper):
             raise PrologMemoryError()
         return t
 
+    def to_bytes(self):
+        """Serialize the recorded term. See `Term.to_bytes`."""
+        with Frame():
+            return self.get().to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Record a term serialized by `Term.to_bytes` or `to_bytes`."""
+        with Frame():
+            return cls(Term.from_bytes(data))
+
+    def __reduce__(self):
+        """Pickle support using the binary encoding of `to_bytes`."""
+        return (TermRecord.from_bytes, (self.to_bytes(),))
+
     def __del__(self):
         PL_erase(self._handle)
 
 
+class TermStore(object):
+    """An append-only file of serialized terms.
+
+    Terms are stored in the external record format of `Term.to_bytes`, each
+    preceded by its length as a little-endian 64-bit integer. Stored terms are
+    read back through a memory map of the file without copying them in Python,
+    so the records do not occupy the Prolog record database.
+
+    >>> with TermStore('terms.db') as store:
+    ...     index = store.append(Term.from_parsed('foo(X, X)'))
+    ...     term = store[index]
+    """
+    _header = struct.Struct('<Q')
+
+    def __init__(self, path):
+        """Open or create a term store.
+
+        Args:
+            path (str): Path of the store file. Existing entries are indexed.
+        """
+        self.path = path
+        self._file = open(path, 'a+b')
+        self._map = None
+        self._entries = []
+        self._load_index()
+
+    def _load_index(self):
+        header_size = self._header.size
+        file_size = os.fstat(self._file.fileno()).st_size
+        position = 0
+        self._file.seek(0)
+        while position + header_size <= file_size:
+            size, = self._header.unpack(self._file.read(header_size))
+            if position + header_size + size > file_size:
+                break
+            position += header_size
+            self._entries.append((position, size))
+            position += size
+            self._file.seek(position)
+        if position < file_size:
+            # Drop an incomplete trailing entry so that appended entries
+            # start at an entry boundary.
+            self._file.truncate(position)
+
+    def append(self, term):
+        """Append a term to the store.
+
+        Args:
+            term (Term): Term to store.
+
+        Returns:
+            int: Index of the stored term.
+        """
+        data = term.to_bytes()
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell() + self._header.size
+        self._file.write(self._header.pack(len(data)))
+        self._file.write(data)
+        self._entries.append((offset, len(data)))
+        return len(self._entries) - 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        """Read a stored term.
+
+        Args:
+            index (int): Index of the term, as returned by `append`.
+
+        Returns:
+            Term: A new term holding a copy of the stored term.
+        """
+        offset, size = self._entries[index]
+        if self._map is None or offset + size > len(self._map):
+            self._remap()
+        record = c_char.from_buffer(self._map, offset)
+        try:
+            term = Term()
+            if not PL_recorded_external(byref(record), term._handle):
+                raise PrologMemoryError()
+        finally:
+            del record
+        return term
+
+    def _remap(self):
+        self._file.flush()
+        if self._map is not None:
+            self._map.close()
+        # ACCESS_COPY gives a writable buffer for ctypes without copying or
+        # modifying the file.
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def close(self):
+        """Close the store file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return 'TermStore(path={path!r})'.format(path=self.path)
+
+
 class Frame(HandleWrapper, TemporaryHandleMixIn):
     """A prolog frame context.
 
@@ -1564,7 +2861,7 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         """
         super().__init__(handle=PL_open_foreign_frame())
         self.discard_on_exit = discard
-        self._associated_terms = []
+        self._generation = 0
 
     def close(self):
         """Close the frame.
@@ -1572,7 +2869,7 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         Discard all term references created since the frame was opened,
         retaining all other prolog data.
         """
-        self._invalidate_associated_terms()
+        self._generation += 1
         PL_close_foreign_frame(self._handle)
         self._invalidate()
 
@@ -1582,7 +2879,7 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         Discard all term references, bindings, and prolog data created since
         the frame was opened.
         """
-        self._invalidate_associated_terms()
+        self._generation += 1
         PL_discard_foreign_frame(self._handle)
         self._invalidate()
 
@@ -1592,7 +2889,7 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         Undo all bindings and discard all term references created since the
         frame was opened. Does not pop the frame.
         """
-        self._invalidate_associated_terms()
+        self._generation += 1
         PL_rewind_foreign_frame(self._handle)
 
     def term(self):
@@ -1611,9 +2908,42 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         rather than immediately terminating the program with a segfault.
         """
         term = TemporaryTerm()
-        self._associated_terms.append(term)
+        term._bind(self)
         return term
 
+    def terms(self, n):
+        """Safely create `n` Term objects within this frame.
+
+        Like `term`, but the term references are allocated as one contiguous
+        block.
+
+        Returns:
+            list: `n` new `TemporaryTerm` objects, each initially a variable.
+        """
+        handle = PL_new_term_refs(n)
+        # Bind the whole block at once, sharing one owners tuple.
+        owners = ((self, self._generation),)
+        arena = TermArena._current()
+        if arena is not None:
+            owners += ((arena, arena._generation),)
+        terms = [TemporaryTerm._from_handle(handle + i) for i in range(n)]
+        for term in terms:
+            term._owners = owners
+        return terms
+
+    def term_list(self, n):
+        """Safely create a TermList of length `n` within this frame.
+
+        The returned term list is invalidated like the terms returned by
+        `term`.
+
+        Returns:
+            TemporaryTermList: A new list of `n` variables.
+        """
+        termlist = TemporaryTermList(n)
+        termlist._bind(self)
+        return termlist
+
     def __enter__(self):
         return self
 
@@ -1623,7 +2953,1052 @@ class Frame(HandleWrapper, TemporaryHandleMixIn):
         else:
             self.close()
 
-    def _invalidate_associated_terms(self):
-        for term in self._associated_terms:
-            term._invalidate()
-        self._associated_terms = []
+
+class _TermArenaStack(threading.local):
+    """The active `TermArena` objects of a thread, innermost last."""
+    def __init__(self):
+        self.arenas = []
+
+
+class TermArena(object):
+    """Scope that releases the term references created within it.
+
+    While an arena is active in a thread, every `Term` and `TermList` created
+    in that thread, or wrapping a term reference allocated since the arena was
+    entered, is temporary and owned by the arena. When the arena exits, all
+    term references allocated since it was entered are released with
+    ``PL_reset_term_refs`` and the Python objects are invalidated, so using
+    them raises an exception instead of crashing.
+
+    >>> with TermArena():
+    ...     Term.from_parsed('foo(X)').get_arg(0).unify_integer(1)
+    True
+
+    An arena can also be used as a function decorator, in which case each call
+    runs in a new arena:
+
+    >>> @TermArena()
+    ... def handle_request(text):
+    ...     return Term.from_parsed(text).to_python()
+
+    Values that must outlive the arena should be converted to Python values or
+    stored in a `TermRecord`.
+
+    Note:
+        Arenas release term references in stack order. Frames and queries
+        opened within an arena must be closed before it exits.
+    """
+    _local = _TermArenaStack()
+
+    def __init__(self):
+        self._mark = None
+        self._generation = 0
+
+    @classmethod
+    def _current(cls):
+        """The innermost active arena of the calling thread, or ``None``."""
+        arenas = cls._local.arenas
+        return arenas[-1] if arenas else None
+
+    @classmethod
+    def _owner_of(cls, handle):
+        """The innermost active arena of the calling thread that releases the
+        term reference `handle`, or ``None``."""
+        for arena in reversed(cls._local.arenas):
+            if handle >= arena._mark:
+                return arena
+        return None
+
+    def _register(self, wrapper):
+        if isinstance(wrapper, TemporaryHandleMixIn):
+            wrapper._bind(self)
+
+    def __enter__(self):
+        if self._mark is not None:
+            raise RuntimeError('TermArena is already active.')
+        self._mark = PL_new_term_ref()
+        self._local.arenas.append(self)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self._local.arenas.remove(self)
+        self._generation += 1
+        PL_reset_term_refs(self._mark)
+        self._mark = None
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with TermArena():
+                return function(*args, **kwargs)
+        return wrapper
+
+
+class Engine(HandleWrapper):
+    """A Prolog engine.
+
+    Each engine has its own stacks, so queries on different engines can run
+    in parallel from different threads. An engine can be used by at most one
+    thread at a time. Use the engine as a context manager to make it the
+    current engine of the calling thread:
+
+    >>> engine = Engine()
+    >>> with engine:
+    ...     Query.call_term(Term.from_parsed('true')).collect(Term())
+    [None]
+    >>> engine.destroy()
+
+    Terms, frames and queries belong to the engine that was current when they
+    were created and must not be used on another engine.
+    """
+    def __init__(self):
+        """Create a new engine."""
+        handle = PL_create_engine(None)
+        if not handle:
+            raise PrologMemoryError()
+        super().__init__(handle=handle)
+        self._previous_engines = []
+
+    def __repr__(self):
+        return 'Engine(handle={handle!r})'.format(handle=self._handle)
+
+    def __enter__(self):
+        previous = PL_engine_t()
+        result = PL_set_engine(self._handle, byref(previous))
+        if result == PL_ENGINE_INUSE:
+            raise RuntimeError('Engine is in use by another thread.')
+        elif result != PL_ENGINE_SET:
+            raise ValueError('Invalid engine.')
+        self._previous_engines.append(previous.value)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        PL_set_engine(self._previous_engines.pop(), None)
+
+    def destroy(self):
+        """Destroy the engine and all its data.
+
+        The engine must not be current in any thread.
+        """
+        PL_destroy_engine(self._handle)
+
+
+class EnginePool(object):
+    """A fixed set of engines leased to threads.
+
+    >>> pool = EnginePool(4)
+    >>> def work(i):
+    ...     with pool.lease():
+    ...         succ = Predicate.from_name_arity('succ', 2)
+    ...         return succ.map([(i, None)], out=1)
+    >>> with ThreadPoolExecutor(4) as executor:
+    ...     list(executor.map(work, range(3)))
+    [[1], [2], [3]]
+
+    Since ctypes releases the GIL during foreign calls, Prolog work on
+    different leased engines runs in parallel.
+    """
+    def __init__(self, size):
+        """Create `size` engines.
+
+        Args:
+            size (int): Number of engines, i.e. the maximum number of threads
+                that can run Prolog code from this pool at once.
+        """
+        self.size = size
+        self._engines = queue.LifoQueue()
+        for _ in range(size):
+            self._engines.put(Engine())
+        self._local = threading.local()
+
+    def __repr__(self):
+        return 'EnginePool(size={size!r})'.format(size=self.size)
+
+    @contextmanager
+    def lease(self):
+        """Use an engine from the pool in the calling thread.
+
+        Blocks until an engine is free. Nested leases in the same thread reuse
+        the engine that the thread already holds.
+
+        Yields:
+            Engine: The engine, which is current for the duration of the lease.
+        """
+        engine = getattr(self._local, 'engine', None)
+        if engine is not None:
+            yield engine
+            return
+
+        engine = self._engines.get()
+        self._local.engine = engine
+        try:
+            with engine:
+                yield engine
+        finally:
+            self._local.engine = None
+            self._engines.put(engine)
+
+    def close(self):
+        """Destroy all engines, waiting for leased engines to be returned."""
+        for _ in range(self.size):
+            self._engines.get().destroy()
+
+
+class PrologProcessPool(object):
+    """A pool of forked worker processes sharing the loaded Prolog state.
+
+    Load the knowledge base before creating the pool. The workers are forked
+    from the current process and inherit its Prolog state copy-on-write, so
+    nothing is reloaded per worker.
+
+    >>> Term.from_parsed('consult(rules)')()  # doctest: +SKIP
+    >>> with PrologProcessPool(4) as pool:
+    ...     pool.map(['between(1, 3, X)', 'member(X, [a, b])'], template='X')
+    [[1, 2, 3], ['a', 'b']]
+
+    Goals are either strings, which are parsed together with the template so
+    that they share variables, or `Term` objects. All solutions of a goal are
+    collected in the worker (see `Query.collect`) and returned as Python
+    values.
+
+    A Prolog exception raised by a goal is re-raised in the calling process as
+    a `PrologException` whose `exception_term` is the text of the Prolog
+    exception term.
+
+    Note:
+        Forking copies only the calling thread. All workers are forked when
+        the pool is created, while the Prolog garbage collection thread is
+        stopped, and the pool never forks again: workers that die are not
+        replaced and the goals they were solving are never completed. The
+        pool cannot be created while other Prolog threads or engines exist,
+        e.g. those of an `EnginePool` or `PrologExecutor`.
+    """
+    def __init__(self, processes=None):
+        """Fork the worker processes.
+
+        Args:
+            processes (int): Number of worker processes.
+                If ``None``, uses the number of CPUs.
+
+        Raises:
+            RuntimeError: If other Prolog threads or engines exist.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        context = multiprocessing.get_context('fork')
+        self._tasks = context.SimpleQueue()
+        self._results = context.SimpleQueue()
+        self._futures = {}
+        self._task_ids = itertools.count()
+        self._workers = [
+            context.Process(target=_pool_worker,
+                            args=(self._tasks, self._results), daemon=True)
+            for _ in range(processes)]
+        with Frame():
+            restart_gc_thread = Term.from_parsed(
+                'current_prolog_flag(gc_thread, true)')()
+            Term.from_parsed('set_prolog_gc_thread(stop)')(check=True)
+            try:
+                if not Term.from_parsed(
+                        'thread_self(Self), '
+                        '\\+ (thread_property(Thread, status(_)), '
+                        'Thread \\== Self)')():
+                    raise RuntimeError(
+                        'Cannot fork while other Prolog threads or engines '
+                        'exist.')
+                for worker in self._workers:
+                    worker.start()
+            finally:
+                if restart_gc_thread:
+                    Term.from_parsed('set_prolog_gc_thread(true)')(check=True)
+        # Started after forking, so that no Python thread is copied either.
+        self._result_thread = threading.Thread(target=self._handle_results,
+                                               daemon=True)
+        self._result_thread.start()
+
+    def _handle_results(self):
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            task_id, success, value = result
+            future = self._futures.pop(task_id)
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def submit(self, goal, template=None):
+        """Find all solutions of a goal in a worker process.
+
+        Args:
+            goal (str or Term)    : Goal to solve.
+            template (str or Term): Value to collect for each solution.
+                Must be the same type as `goal`.
+                If ``None``, the instantiated goal is collected.
+
+        Returns:
+            concurrent.futures.Future: Future whose `result` is the list of
+                values of `template`.
+        """
+        data = _pool_task_bytes(goal, template)
+        task_id = next(self._task_ids)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._futures[task_id] = future
+        self._tasks.put((task_id, data))
+        return future
+
+    def map(self, goals, template=None):
+        """Find all solutions of each goal, distributed over the workers.
+
+        Args:
+            goals (iterable)      : Goals to solve. See `submit`.
+            template (str or Term): Value to collect for each solution.
+
+        Returns:
+            list: A list of solutions for each goal.
+        """
+        futures = [self.submit(goal, template) for goal in goals]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Stop the workers once all submitted goals have been solved."""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._stop_result_thread()
+
+    def terminate(self):
+        """Stop the workers immediately."""
+        for worker in self._workers:
+            worker.terminate()
+        for worker in self._workers:
+            worker.join()
+        self._stop_result_thread()
+        for future in self._futures.values():
+            future.set_exception(RuntimeError('Pool was terminated.'))
+        self._futures.clear()
+
+    def _stop_result_thread(self):
+        if self._result_thread.is_alive():
+            self._results.put(None)
+            self._result_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+def _pool_worker(tasks, results):
+    """Solve tasks of a `PrologProcessPool` until ``None`` is received."""
+    PL_cleanup_fork()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, data = task
+        try:
+            result = (task_id, True, _run_pool_task(data))
+        except Exception as e:
+            result = (task_id, False, e)
+        results.put(result)
+
+
+def _pool_task_bytes(goal, template):
+    """Serialize `Template-Goal` for a `PrologProcessPool` worker."""
+    with Frame():
+        if isinstance(goal, str):
+            task = Term.from_parsed('({template})-({goal})'.format(
+                template=goal if template is None else template, goal=goal))
+        else:
+            task = _pool_task_functor(goal if template is None else template,
+                                      goal)
+        return task.to_bytes()
+
+
+def _run_pool_task(data):
+    """Collect all solutions of a task serialized by `_pool_task_bytes`."""
+    with Frame():
+        task = Term.from_bytes(data)
+        results = Term()
+        error = Term()
+        findall = _pool_findall_functor(task.get_arg(0), task.get_arg(1),
+                                        results)
+        _pool_catch_functor(findall, error, Term.from_atom_name('true'))()
+        if not error.is_variable():
+            raise PrologException(error.get_chars())
+        return results.to_python()
+
+_pool_task_functor = Functor('-', 2)
+_pool_findall_functor = Functor('findall', 3)
+_pool_catch_functor = Functor('catch', 3)
+
+
+class PrologExecutor(object):
+    """Runs Prolog work on dedicated threads, each owning its own `Engine`.
+
+    Work is submitted through a bounded queue. From asyncio code use `run`,
+    `Predicate.acall` or `Query.asolutions`, which never block the event loop.
+
+    >>> executor = PrologExecutor()
+    >>> succ = Predicate.from_name_arity('succ', 2)
+    >>> await succ.acall(1, None, out=1, executor=executor)
+    2
+    """
+    def __init__(self, workers=1, max_pending=1024):
+        """Start the executor threads.
+
+        Args:
+            workers (int)    : Number of threads (and engines).
+            max_pending (int): Maximum number of queued tasks.
+        """
+        self._tasks = queue.Queue(max_pending)
+        self._threads = [threading.Thread(target=self._work, daemon=True)
+                         for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __repr__(self):
+        return 'PrologExecutor(workers={workers!r})'.format(
+            workers=len(self._threads))
+
+    def _work(self):
+        engine = Engine()
+        with engine:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, function, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = function(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        engine.destroy()
+
+    def submit(self, function, *args):
+        """Run ``function(*args)`` on an executor thread.
+
+        Blocks while the task queue is full.
+
+        Returns:
+            concurrent.futures.Future: The result of the call.
+        """
+        future = Future()
+        self._tasks.put((future, function, args))
+        return future
+
+    async def _asubmit(self, function, *args):
+        """Like `submit`, but waits for queue space without blocking the
+        event loop."""
+        future = Future()
+        task = (future, function, args)
+        try:
+            self._tasks.put_nowait(task)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._tasks.put, task)
+        return future
+
+    async def run(self, function, *args):
+        """Run ``function(*args)`` on an executor thread and await the result.
+        """
+        return await asyncio.wrap_future(
+            await self._asubmit(function, *args))
+
+    def shutdown(self):
+        """Stop the executor threads once all queued tasks are done."""
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def _get_default_executor():
+    """The `PrologExecutor` used when none is given, created on first use."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = PrologExecutor(workers=4)
+        return _default_executor
+
+
+def _detached_map(predicate, rows, out, goal_context_module):
+    """`Predicate.map` for `Predicate.acall`.
+
+    Exception terms are converted to text, since they do not outlive the
+    executor's frame.
+    """
+    try:
+        return predicate.map(rows, out, goal_context_module)
+    except PrologException as e:
+        raise PrologException(str(e.exception_term)) from None
+
+
+def _produce_solutions(data, goal_context_module, emit, permits, stop):
+    """Solve a serialized ``Template-Goal`` task for `Query.asolutions`.
+
+    Calls ``emit(kind, value)`` with each solution, then with ``'done'`` or
+    ``'error'``. Waits on `permits` before looking for each solution.
+    """
+    try:
+        with Frame(discard=True):
+            task = Term.from_bytes(data)
+            template = task.get_arg(0)
+            query = Query.call_term(task.get_arg(1),
+                                    goal_context_module=goal_context_module)
+            with query as active_query:
+                while True:
+                    permits.acquire()
+                    if stop.is_set():
+                        break
+                    try:
+                        if not active_query.next_solution():
+                            break
+                    except PrologException as e:
+                        # The exception term does not outlive the query.
+                        raise PrologException(str(e.exception_term)) from None
+                    emit('solution', template.to_python())
+    except Exception as e:
+        emit('error', e)
+    else:
+        emit('done', None)
+
+
+# Callbacks of registered foreign predicates. Prolog keeps pointers to them, so
+# they must never be garbage collected.
+_foreign_callbacks = []
+# Generators of nondeterministic foreign predicates awaiting a redo, by the
+# context passed to _PL_retry (at most 30 bits).
+_foreign_generators = {}
+_foreign_generators_lock = threading.Lock()
+_last_foreign_context_id = 0
+
+
+def register_foreign(function, name=None, arity=None, module=None,
+                     nondeterministic=False):
+    """Make a Python function callable as a Prolog predicate.
+
+    The function is called with its arguments converted by `Term.to_python`
+    (unbound variables become ``None``). Its result determines the outcome:
+
+        * ``True`` or ``None``: succeed.
+        * ``False``           : fail.
+        * ``tuple``           : unify each argument with the corresponding
+          value, converted as by `Term.put_python`. ``None`` values leave the
+          argument unchanged.
+
+    A nondeterministic predicate is implemented by a generator function.
+    Each yielded value is a result as above and backtracking into the
+    predicate resumes the generator. The generator is closed if the choice
+    point is cut.
+
+    Python exceptions are raised in Prolog as ``python_error(Type, Message)``.
+
+    >>> def increments(x, y):
+    ...     yield (x, x + 1)
+    ...     yield (x, x + 2)
+    >>> register_foreign(increments, nondeterministic=True)
+    >>> Y = Term()
+    >>> goal = Functor('increments', 2)(Term.from_integer(1), Y)
+    >>> Query.call_term(goal).collect(Y)
+    [2, 3]
+
+    Args:
+        function (callable)    : Function implementing the predicate.
+        name (str)             : Name of the predicate.
+            If ``None``, uses the name of `function`.
+        arity (int)            : Arity of the predicate.
+            If ``None``, uses the number of positional parameters of
+            `function`.
+        module (str)           : Name of the module to define the predicate
+            in. If ``None``, uses the current context module.
+        nondeterministic (bool): If ``True``, `function` returns an iterator
+            of results.
+    """
+    if name is None:
+        name = function.__name__
+    if arity is None:
+        parameters = inspect.signature(function).parameters.values()
+        if any(parameter.kind == parameter.VAR_POSITIONAL
+               for parameter in parameters):
+            raise ValueError('Arity must be given for variadic functions.')
+        arity = sum(1 for parameter in parameters
+                    if parameter.kind in (parameter.POSITIONAL_ONLY,
+                                          parameter.POSITIONAL_OR_KEYWORD))
+
+    if nondeterministic:
+        callback = pl_function_va_t(_nondeterministic_foreign(function))
+        flags = PL_FA_VARARGS | PL_FA_NONDETERMINISTIC
+    else:
+        callback = pl_function_va_t(_deterministic_foreign(function))
+        flags = PL_FA_VARARGS
+    _foreign_callbacks.append(callback)
+    if not PL_register_foreign_in_module(
+            module.encode() if module is not None else None,
+            name.encode(), arity, callback, flags):
+        raise ValueError('Could not register foreign predicate {}/{}.'.format(
+            name, arity))
+
+
+def foreign_predicate(name=None, arity=None, module=None,
+                      nondeterministic=False):
+    """Decorator registering a function as a Prolog predicate.
+
+    See `register_foreign` for the arguments and calling convention.
+
+    >>> @foreign_predicate()
+    ... def python_upper(text, upper):
+    ...     return (text, text.upper())
+    """
+    def decorator(function):
+        register_foreign(function, name=name, arity=arity, module=module,
+                         nondeterministic=nondeterministic)
+        return function
+    return decorator
+
+
+def _deterministic_foreign(function):
+    """Foreign function calling `function` once. See `register_foreign`."""
+    def foreign(arguments, arity, context):
+        try:
+            result = function(*_foreign_arguments(arguments, arity))
+            return _unify_foreign_result(arguments, arity, result)
+        except Exception as e:
+            return _raise_python_exception(e)
+    return foreign
+
+
+def _add_foreign_generator(generator):
+    """Store `generator` in `_foreign_generators` under an unused context.
+
+    Returns:
+        int: The context to pass to ``_PL_retry``.
+    """
+    global _last_foreign_context_id
+    with _foreign_generators_lock:
+        context_id = _last_foreign_context_id
+        while True:
+            context_id = context_id % ((1 << 29) - 1) + 1
+            if context_id not in _foreign_generators:
+                break
+        _foreign_generators[context_id] = generator
+        _last_foreign_context_id = context_id
+    return context_id
+
+
+def _nondeterministic_foreign(function):
+    """Foreign function driving the generator returned by `function`.
+    See `register_foreign`."""
+    def foreign(arguments, arity, context):
+        control = PL_foreign_control(context)
+        try:
+            if control == PL_FIRST_CALL:
+                generator = iter(
+                    function(*_foreign_arguments(arguments, arity)))
+                context_id = _add_foreign_generator(generator)
+            else:
+                context_id = PL_foreign_context(context)
+                generator = _foreign_generators[context_id]
+        except Exception as e:
+            return _raise_python_exception(e)
+
+        # The generator keeps its context until it is exhausted or pruned, so
+        # the context is not reused while a redo is pending.
+        try:
+            if control == PL_PRUNED:
+                _foreign_generators.pop(context_id)
+                generator.close()
+                return True
+
+            for result in generator:
+                frame = PL_open_foreign_frame()
+                if _unify_foreign_result(arguments, arity, result):
+                    PL_close_foreign_frame(frame)
+                    return _PL_retry(context_id)
+                PL_discard_foreign_frame(frame)
+            _foreign_generators.pop(context_id)
+            return False
+        except Exception as e:
+            _foreign_generators.pop(context_id, None)
+            return _raise_python_exception(e)
+    return foreign
+
+
+def _foreign_arguments(arguments, arity):
+    """Arguments of a foreign predicate call as Python values."""
+    return [_term_handle_to_python(arguments + i) for i in range(arity)]
+
+
+def _unify_foreign_result(arguments, arity, result):
+    """Apply the result of a foreign predicate. See `register_foreign`."""
+    if result is None or result is True:
+        return True
+    if result is False:
+        return False
+    if not isinstance(result, tuple) or len(result) != arity:
+        raise TypeError(
+            'Foreign predicate result must be a bool or a tuple of '
+            '{} values, not {!r}.'.format(arity, result))
+
+    value = PL_new_term_ref()
+    functor_handles = {}
+    for i, argument_value in enumerate(result):
+        if argument_value is None:
+            continue
+        _put_python(value, argument_value, functor_handles)
+        if not PL_unify(arguments + i, value):
+            return False
+    return True
+
+
+def _raise_python_exception(exception):
+    """Raise `exception` in Prolog as ``python_error(Type, Message)``."""
+    exception_term = PL_new_term_ref()
+    _put_python(exception_term,
+                ('python_error', type(exception).__name__, str(exception)), {})
+    return PL_raise_exception(exception_term)
+
+
+class Stream(object):
+    """A Prolog stream reading from or writing to a Python file object.
+
+    Prolog buffers the stream on the C side and calls back into Python only
+    to fill or empty its buffer.
+
+    >>> output = io.BytesIO()
+    >>> with Stream(output, 'w') as stream:
+    ...     Functor('write', 2)(stream.term, Term.from_parsed('foo(x)'))()
+    True
+    >>> output.getvalue()
+    b'foo(x)'
+
+    The stream is closed by `close` or by closing it in Prolog with
+    ``close/1``, whichever happens first. The Python file is not closed.
+    """
+    _streams = {}
+    _stream_ids = itertools.count(1)
+
+    def __init__(self, file, mode='r', encoding='utf8'):
+        """Open a stream.
+
+        Args:
+            file       : Binary file object to read from (using ``readinto`` or
+                ``read``) or write to (using ``write``). For reading, a
+                bytes-like object may be given instead.
+            mode (str) : ``'r'`` for an input stream or ``'w'`` for an output
+                stream.
+            encoding (str): ``'utf8'`` for a text stream or ``None`` for a
+                binary stream.
+        """
+        if mode == 'r':
+            if not hasattr(file, 'read'):
+                file = io.BytesIO(file)
+            flags = SIO_INPUT
+        elif mode == 'w':
+            flags = SIO_OUTPUT
+        else:
+            raise ValueError('Invalid mode: {!r}'.format(mode))
+        if encoding == 'utf8':
+            flags |= SIO_TEXT
+            stream_encoding = ENC_UTF8
+        elif encoding is None:
+            stream_encoding = ENC_OCTET
+        else:
+            raise ValueError('Unsupported encoding: {!r}'.format(encoding))
+
+        self.file = file
+        self.mode = mode
+        self._id = next(self._stream_ids)
+        self._streams[self._id] = self
+        self._stream = Snew(self._id, flags | SIO_FBUF | SIO_RECORDPOS,
+                            byref(_stream_functions))
+        if not self._stream:
+            del self._streams[self._id]
+            raise PrologMemoryError()
+        Ssetenc(self._stream, stream_encoding, None)
+
+    def __repr__(self):
+        return 'Stream(file={file!r}, mode={mode!r})'.format(
+            file=self.file, mode=self.mode)
+
+    @property
+    def closed(self):
+        """Whether the stream has been closed."""
+        return self._id not in self._streams
+
+    @property
+    def term(self):
+        """A new `Term` referencing this stream, for passing to Prolog.
+
+        Each access creates the term in the current frame, so it can be used
+        only as long as any other term created there.
+        """
+        if self.closed:
+            raise ValueError('Stream is closed.')
+        term = Term()
+        term._require_success(PL_unify_stream(term._handle, self._stream))
+        return term
+
+    def flush(self):
+        """Write buffered output to the Python file."""
+        if not self.closed:
+            Sflush(self._stream)
+
+    def close(self):
+        """Close the stream, flushing buffered output."""
+        if not self.closed:
+            Sclose(self._stream)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+def _stream_read(handle, buffer, size):
+    try:
+        file = Stream._streams[handle].file
+        view = (c_char * size).from_address(addressof(buffer.contents))
+        try:
+            readinto = file.readinto
+        except AttributeError:
+            data = file.read(size)
+            view[:len(data)] = data
+            return len(data)
+        return readinto(view)
+    except Exception:
+        return -1
+
+
+def _stream_write(handle, buffer, size):
+    try:
+        Stream._streams[handle].file.write(buffer[:size])
+        return size
+    except Exception:
+        return -1
+
+
+def _stream_close(handle):
+    Stream._streams.pop(handle, None)
+    return 0
+
+# Shared by all `Stream` objects, which are told apart by their handle.
+_stream_functions = IOFUNCTIONS(read=Sread_function(_stream_read),
+                                write=Swrite_function(_stream_write),
+                                close=Sclose_function(_stream_close))
+
+
+def consult_string(source, module=None, source_id=None):
+    """Load Prolog clauses from a string.
+
+    See `consult_bytes`.
+    """
+    consult_bytes(source.encode(), module=module, source_id=source_id)
+
+
+def consult_bytes(source, module=None, source_id=None):
+    """Load Prolog clauses from UTF-8 encoded source text in memory.
+
+    The source is compiled by ``load_files/2`` from a `Stream` over the
+    buffer, exactly as if it were consulted from a file, but without a
+    temporary file.
+
+    Args:
+        source (bytes-like): Program text.
+        module (str)       : Module to load the clauses into.
+            If ``None``, loads into ``user``. Module declarations in the
+            source take precedence.
+        source_id (str)    : Source identifier of the clauses, in place of
+            a file name. Loading again with the same identifier replaces the
+            clauses loaded previously. If ``None``, a new identifier is used.
+
+    Raises:
+        PrologCallFailed: If the source could not be loaded.
+    """
+    if source_id is None:
+        source_id = 'swilite_source_{}'.format(next(_consult_source_ids))
+    with Frame():
+        with Stream(source, 'r') as stream:
+            target = Term.from_python(
+                (':', 'user' if module is None else module, source_id))
+            options = Term.from_python([('stream', stream.term)])
+            _load_files_functor(target, options)(check=True)
+
+_consult_source_ids = itertools.count(1)
+_load_files_functor = Functor('load_files', 2)
+
+
+def assert_facts(functor, rows, module=None, batch_size=10000):
+    """Add a fact to the database for each row, as by ``assertz/1``.
+
+    Facts are built for a chunk of rows at a time and passed to Prolog as a
+    single list, which is asserted by a loop in Prolog. All terms are created
+    in one frame that is rewound after each chunk.
+
+    Args:
+        functor (Functor or str): Functor (or name) of the facts.
+        rows (iterable)         : Argument values of each fact, converted as
+            by `Term.put_python`.
+        module (str)            : Module to assert the facts in.
+            If ``None``, uses ``user``.
+        batch_size (int)        : Number of facts passed to Prolog at once.
+
+    Returns:
+        int: The number of facts asserted.
+
+    Raises:
+        PrologCallFailed: If the facts could not be asserted.
+    """
+    functor_handles = {}
+
+    def put_fact(handle, row):
+        _put_python_compound(handle, (functor,) + tuple(row), functor_handles)
+
+    return _assert_fact_rows(rows, put_fact, module, batch_size)
+
+
+def _assert_fact_rows(rows, put_fact, module, batch_size):
+    """Assert a fact built by ``put_fact(handle, row)`` for each row.
+
+    See `assert_facts`.
+    """
+    rows = iter(rows)
+    count = 0
+    with Frame() as frame:
+        while True:
+            chunk = list(itertools.islice(rows, batch_size))
+            if not chunk:
+                break
+            facts = frame.term()
+            _put_python_list(facts._handle, chunk, put_fact)
+            fact = frame.term()
+            goal = frame.term()
+            goal.put_python(
+                ('forall', ('member', fact, facts),
+                 ('assertz',
+                  (':', 'user' if module is None else module, fact))))
+            goal(check=True)
+            count += len(chunk)
+            frame.rewind()
+    return count
+
+
+def load_csv(source, functor, types, module=None, delimiter=',',
+             skip_header=False, encoding='utf8', batch_size=10000):
+    """Assert a fact for each row of a CSV (or TSV) file.
+
+    The file is read and asserted in chunks of `batch_size` rows (see
+    `assert_facts`), so memory use does not grow with the file size.
+    Empty lines are skipped.
+
+    Args:
+        source (str or file)    : Path or binary file object to read.
+        functor (Functor or str): Functor (or name) of the facts.
+            The arity is the number of columns.
+        types (sequence)        : Type of each column; one of ``'int'``,
+            ``'float'``, ``'atom'`` or ``'string'``.
+        module (str)            : Module to assert the facts in.
+            If ``None``, uses ``user``.
+        delimiter (str)         : Column delimiter, e.g. ``'\\t'`` for TSV.
+        skip_header (bool)      : Skip the first row.
+        encoding (str)          : Text encoding of the file.
+        batch_size (int)        : Number of facts passed to Prolog at once.
+
+    Returns:
+        int: The number of facts asserted.
+
+    Raises:
+        ValueError      : If the arity of `functor` does not match `types`,
+            a row has the wrong number of columns or a value cannot be
+            converted to its column type.
+        PrologCallFailed: If the facts could not be asserted.
+    """
+    try:
+        putters = [_csv_column_putters[column_type] for column_type in types]
+    except KeyError as e:
+        raise ValueError('Unknown column type: {!r}'.format(e.args[0]))
+    arity = len(putters)
+    if not isinstance(functor, Functor):
+        functor = Functor(functor, arity)
+    elif functor.get_arity() != arity:
+        raise ValueError(
+            'Functor {functor} has arity {functor_arity}, expected {arity}.'
+            .format(functor=functor, functor_arity=functor.get_arity(),
+                    arity=arity))
+    functor_handle = functor._handle
+
+    def put_fact(handle, row):
+        if len(row) != arity:
+            raise ValueError(
+                'Row {row!r} has {ncolumns} columns, expected {arity}.'.format(
+                    row=row, ncolumns=len(row), arity=arity))
+        arguments = PL_new_term_refs(arity)
+        for i, (putter, text) in enumerate(zip(putters, row)):
+            putter(arguments + i, text)
+        success = PL_cons_functor_v(handle, functor_handle, arguments)
+        PL_reset_term_refs(arguments)
+        if not success:
+            raise PrologMemoryError()
+
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return _load_csv_file(file, put_fact, module, delimiter,
+                                  skip_header, encoding, batch_size)
+    return _load_csv_file(source, put_fact, module, delimiter, skip_header,
+                          encoding, batch_size)
+
+
+def _load_csv_file(file, put_fact, module, delimiter, skip_header, encoding,
+                   batch_size):
+    text = io.TextIOWrapper(file, encoding=encoding, newline='')
+    try:
+        rows = csv.reader(text, delimiter=delimiter)
+        if skip_header:
+            next(rows, None)
+        return _assert_fact_rows((row for row in rows if row), put_fact,
+                                 module, batch_size)
+    finally:
+        # Leave `file` open for the caller.
+        text.detach()
+
+
+def _put_int_text(handle, text):
+    value = int(text)
+    if -2**63 <= value < 2**63:
+        PL_put_int64(handle, value)
+    elif not PL_chars_to_term(str(value).encode(), handle):
+        raise PrologMemoryError()
+
+
+def _put_float_text(handle, text):
+    PL_put_float(handle, float(text))
+
+
+def _put_atom_text(handle, text):
+    encoded_text = text.encode()
+    PL_put_atom_nchars(handle, len(encoded_text), encoded_text)
+
+
+def _put_string_text(handle, text):
+    encoded_text = text.encode()
+    PL_put_string_nchars(handle, len(encoded_text), encoded_text)
+
+_csv_column_putters = {
+    'int': _put_int_text,
+    'float': _put_float_text,
+    'atom': _put_atom_text,
+    'string': _put_string_text,
+}
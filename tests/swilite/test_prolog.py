@@ -1,14 +1,27 @@
+import array
+import asyncio
 import copy
 import ctypes
+import io
 import math
+import os
+import pickle
 import re
+import tempfile
+import threading
 
 from nose.tools import (assert_equal, assert_not_equal, assert_raises,
                         assert_false, assert_true, assert_regex,
                         assert_is_instance)
 
-from swilite.prolog import (Atom, PrologCallFailed, Functor, Module, Predicate,
-                            Term, TermList, Frame, Query, TemporaryTerm)
+from swilite.prolog import (Atom, Engine, EnginePool, PrologCallFailed,
+                            PrologException, PrologExecutor,
+                            PrologProcessPool, Functor, Module, Predicate,
+                            Stream, Term, TermArena, TermList,
+                            TermRecord, TermStore, Frame, Query, TemporaryTerm,
+                            assert_facts, consult_bytes, consult_string,
+                            foreign_predicate, load_csv, register_foreign,
+                            to_python)
 
 
 def check_atom(name, atom=None):
@@ -1054,3 +1067,761 @@ def test_query():
     for constructor in constructors:
         for evaluator in evaluators:
             yield check_query, constructor, evaluator
+
+
+def test_term_to_python():
+    with Frame():
+        assert_equal(Term.from_integer(3).to_python(), 3)
+        assert_equal(Term.from_float(2.5).to_python(), 2.5)
+        assert_equal(Term.from_atom_name('foo').to_python(), 'foo')
+        assert_equal(Term.from_string('bar').to_python(), 'bar')
+        assert_equal(Term.from_nil().to_python(), [])
+        assert_equal(Term().to_python(), None)
+        assert_equal(Term.from_parsed('12345678901234567890123').to_python(),
+                     12345678901234567890123)
+        assert_equal(
+            Term.from_parsed('foo(1, 2.5, bar, "s", [a, [b]], _, g(h))')
+            .to_python(),
+            ('foo', 1, 2.5, 'bar', 's', ['a', ['b']], None, ('g', 'h')))
+        for text in ('caf\u00e9', '\u4e2d\u6587'):
+            assert_equal(Term.from_parsed('"{}"'.format(text)).to_python(),
+                         text)
+
+
+def test_term_to_python_partial_list():
+    with Frame():
+        assert_equal(Term.from_parsed('[1, 2|3]').to_python(),
+                     ('[|]', 1, ('[|]', 2, 3)))
+        assert_equal(Term.from_parsed('[[a], [b|c]|_]').to_python(),
+                     ('[|]', ['a'], ('[|]', ('[|]', 'b', 'c'), None)))
+
+
+def test_term_to_python_long_partial_list():
+    with Frame():
+        term = Term.from_parsed('numlist(1, 10000, L), append(L, _, P)')
+        term()
+        value = term.get_arg(1).get_arg(2).to_python()
+        for i in range(1, 10001):
+            assert_equal(value[:2], ('[|]', i))
+            value = value[2]
+        assert_equal(value, None)
+
+
+def test_term_to_python_long_list():
+    with Frame():
+        term = Term.from_parsed('numlist(1, 100000, L)')
+        term()
+        assert_equal(term.get_arg(2).to_python(), list(range(1, 100001)))
+
+
+def test_term_to_python_cyclic():
+    with Frame():
+        term = Term.from_list()
+        term.unify_arg(0, Term.from_integer(5))
+        term.unify_arg(1, term)
+        with assert_raises(ValueError):
+            term.to_python()
+
+
+def test_to_python():
+    with Frame():
+        assert_equal(to_python(Term.from_parsed('[a-1, b-2]')),
+                     [('-', 'a', 1), ('-', 'b', 2)])
+
+
+def test_term_from_python():
+    with Frame():
+        X = Term()
+        term = Term.from_python(
+            ('foo', 1, 2.5, 'bar', ['a', ['b']], True, X, None,
+             (Functor('g', 1), 'h'), ('c',)))
+        assert_equal(
+            term.to_python(),
+            ('foo', 1, 2.5, 'bar', ['a', ['b']], 'true', None, None,
+             ('g', 'h'), 'c'))
+        assert_true(term.get_arg(5).unify_integer(4))
+        assert_equal(X, Term.from_integer(4))
+
+        assert_equal(Term.from_python({'a': 1, 'b': [2]}),
+                     Term.from_parsed('[a-1, b-[2]]'))
+        assert_equal(Term.from_python(2 ** 70), Term.from_parsed(str(2 ** 70)))
+        assert_equal(Term.from_python([]), Term.from_nil())
+
+
+def test_term_from_python_round_trip():
+    value = ('foo', [1, 2, ('-', 'a', 3.5)], 'x', -7)
+    with Frame():
+        assert_equal(Term.from_python(value).to_python(), value)
+
+
+def test_term_from_python_invalid():
+    with Frame():
+        with assert_raises(TypeError):
+            Term.from_python(object())
+        with assert_raises(TypeError):
+            Term.from_python(())
+        with assert_raises(TypeError):
+            Term.from_python((Functor('f', 2), 1))
+
+
+def test_term_put_list_terms():
+    with Frame():
+        terms = [Term.from_integer(i) for i in range(3)]
+        expected = Term.from_parsed('[0, 1, 2]')
+        assert_equal(Term.from_list_terms(terms), expected)
+        assert_equal(len(terms), 3)
+        assert_equal(Term.from_list_terms(tuple(terms)), expected)
+        assert_equal(Term.from_list_terms(iter(terms)), expected)
+        assert_equal(Term.from_list_terms(t for t in terms), expected)
+        assert_equal(Term.from_list_terms([]), Term.from_nil())
+        assert_equal(Term.from_list_terms(iter([])), Term.from_nil())
+
+
+def test_term_put_list_terms_long():
+    with Frame():
+        element = Term.from_atom_name('a')
+        term = Term.from_list_terms([element] * 100000)
+        length = Term()
+        Predicate.from_name_arity('length', 2)(term, length, check=True)
+        assert_equal(int(length), 100000)
+
+
+def test_term_int_list():
+    values = array.array('q', [1, -2, 3, 2 ** 62])
+    with Frame():
+        term = Term.from_int_list(values)
+        assert_equal(term, Term.from_parsed('[1, -2, 3, 4611686018427387904]'))
+        assert_equal(term.get_int_list(), values)
+        assert_equal(Term.from_int_list(memoryview(array.array('i', [5])))
+                     .get_int_list(), array.array('q', [5]))
+        assert_equal(Term.from_int_list(array.array('q')), Term.from_nil())
+        assert_equal(Term.from_nil().get_int_list(), array.array('q'))
+        assert_equal(Term.from_parsed('[1, 2.0]').get_int_list(),
+                     array.array('q', [1, 2]))
+
+        with assert_raises(TypeError):
+            Term.from_int_list(array.array('d', [1.0]))
+        with assert_raises(TypeError):
+            Term.from_parsed('[1, a]').get_int_list()
+        with assert_raises(TypeError):
+            Term.from_parsed('["1"]').get_int_list()
+        with assert_raises(TypeError):
+            Term.from_parsed("['1,2']").get_int_list()
+        with assert_raises(TypeError):
+            Term.from_parsed('[1|_]').get_int_list()
+        with assert_raises(TypeError):
+            Term.from_parsed('[1, {}]'.format(2 ** 70)).get_int_list()
+
+
+def test_term_float_list():
+    values = array.array('d', [0.1, -2.5, 1e300, 5e-324, 3.0])
+    with Frame():
+        term = Term.from_float_list(values)
+        assert_equal(term.get_float_list(), values)
+        assert_equal(Term.from_parsed('[1, 2.5]').get_float_list(),
+                     array.array('d', [1.0, 2.5]))
+
+        special = array.array('d', [float('inf'), 1.5, float('-inf')])
+        assert_equal(Term.from_float_list(special).get_float_list(), special)
+
+        set_flag = Predicate.from_name_arity('set_prolog_flag', 2)
+        float_format = Term()
+        assert_true(Predicate.from_name_arity('current_prolog_flag', 2)(
+            Term.from_atom_name('float_format'), float_format))
+        float_format = TermRecord(float_format)
+        set_flag(Term.from_atom_name('float_format'),
+                 Term.from_atom_name('%.2f'), check=True)
+        try:
+            assert_equal(term.get_float_list(), values)
+        finally:
+            set_flag(Term.from_atom_name('float_format'), float_format.get(),
+                     check=True)
+
+        with assert_raises(TypeError):
+            Term.from_parsed('[1.5, a]').get_float_list()
+        with assert_raises(TypeError):
+            Term.from_atom_name('a').get_float_list()
+
+
+def test_term_list_length_and_item():
+    with Frame():
+        term = Term.from_parsed('[a, b, c]')
+        assert_equal(term.get_list_length(), 3)
+        assert_equal(Term.from_nil().get_list_length(), 0)
+        assert_equal(term.get_list_item(0), Term.from_atom_name('a'))
+        assert_equal(term.get_list_item(2), Term.from_atom_name('c'))
+        assert_equal(term.get_list_item(-1), Term.from_atom_name('c'))
+        with assert_raises(IndexError):
+            term.get_list_item(3)
+        with assert_raises(IndexError):
+            term.get_list_item(-4)
+
+        for not_a_proper_list in ('[a|_]', 'foo(a)', '[a|b]'):
+            with assert_raises(TypeError):
+                Term.from_parsed(not_a_proper_list).get_list_length()
+
+        cyclic = Term.from_list()
+        cyclic.unify_arg(0, Term.from_integer(5))
+        cyclic.unify_arg(1, cyclic)
+        with assert_raises(TypeError):
+            cyclic.get_list_length()
+        with assert_raises(TypeError):
+            cyclic.iter_list()
+
+
+def test_term_iter_list():
+    with Frame():
+        term = Term.from_parsed('[1, 2, 3]')
+        elements = term.iter_list()
+        first = next(elements)
+        assert_is_instance(first, TemporaryTerm)
+        assert_equal(int(first), 1)
+        second = next(elements)
+        with assert_raises(AttributeError):
+            int(first)
+        assert_equal(int(second), 2)
+        assert_equal([int(x) for x in elements], [3])
+
+        assert_equal(list(Term.from_nil().iter_list()), [])
+        with assert_raises(TypeError):
+            Term.from_parsed('[1|_]').iter_list()
+
+
+def test_atom_interned():
+    assert Atom('interned') is Atom('interned')
+    assert Atom('interned') is not Atom('other')
+    assert_equal(Atom('interned'), copy.copy(Atom('interned')))
+    assert_equal(hash(Atom('interned')), hash(copy.copy(Atom('interned'))))
+    assert_equal(len({Atom('x'), Atom('x'), Atom('y')}), 2)
+
+
+def test_atom_cache_eviction():
+    names = ['atom_{}'.format(i) for i in range(2 * Atom._interned.maxsize)]
+    atoms = [Atom(name) for name in names]
+    for name, atom in zip(names, atoms):
+        assert_equal(atom.get_name(), name)
+        assert_equal(atom, Atom(name))
+
+
+def test_atom_interned_threads():
+    pool = EnginePool(4)
+    names = ['threaded_atom_{}'.format(i) for i in range(1000)]
+    results = {}
+
+    def work(i):
+        with pool.lease():
+            results[i] = [Atom(name) for name in names]
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    for atoms in results.values():
+        assert_true(all(a is b for a, b in zip(atoms, results[0])))
+
+
+def test_functor_cached():
+    assert Functor('cached', 2) is Functor('cached', 2)
+    assert Functor('cached', 2) is not Functor('cached', 3)
+    functor = Functor('cached', 2)
+    assert_equal(functor, Functor(Atom('cached'), 2))
+    assert_equal(functor, Functor._from_handle(functor._handle))
+    assert_equal(hash(functor), hash(Functor._from_handle(functor._handle)))
+
+
+def test_predicate_cached():
+    foo = Predicate.from_name_arity('foo', 2)
+    assert foo is Predicate.from_name_arity('foo', 2)
+    assert foo is not Predicate.from_name_arity('foo', 2, 'mod')
+    assert_equal(foo, Predicate(Functor('foo', 2)))
+    assert_equal({foo: 1}[Predicate(Functor('foo', 2))], 1)
+
+
+def test_predicate_cached_info():
+    succ = Predicate.from_name_arity('succ', 2)
+    assert_equal(succ.get_info().arity, 2)
+    assert_equal(succ.get_info().name, Atom('succ'))
+    with Frame():
+        args = TermList(2)
+        args[0].put_integer(3)
+        assert_true(succ(arglist=args, check_arguments=False))
+        assert_equal(args[1].get_integer(), 4)
+        assert_raises(ValueError, succ, arglist=TermList(1))
+
+
+def test_prepared_call():
+    with Frame():
+        succ = Predicate.from_name_arity('succ', 2).prepare()
+        for i in range(100):
+            assert_true(succ(i, None))
+            assert_equal(succ.arglist[1].get_integer(), i + 1)
+        assert_false(succ(1, 3))
+        assert_raises(PrologCallFailed, succ, 1, 3, check=True)
+        assert_raises(ValueError, succ, 1)
+
+
+def test_predicate_map():
+    succ = Predicate.from_name_arity('succ', 2)
+    assert_equal(succ.map([(1, 2), (1, 3), (4, None)]), [True, False, True])
+    assert_equal(succ.map(((i, None) for i in range(1000)), out=1),
+                 list(range(1, 1001)))
+    assert_equal(succ.map([(None, 3), (None, 0)], out=(0, 1)),
+                 [(2, 3), None])
+    assert_raises(ValueError, succ.map, [(1,)])
+    with Frame():
+        with assert_raises(PrologException) as context:
+            succ.map([(1, None), ('a', None)], out=1)
+        assert_equal(context.exception.exception_term.get_name_arity()[0],
+                     Atom('error'))
+
+
+def test_query_collect():
+    with Frame():
+        X = Term()
+        query = Query(Predicate.from_name_arity('between', 3),
+                      Term.from_integer(1), Term.from_integer(1000), X)
+        assert_equal(query.collect(X), list(range(1, 1001)))
+        Y = Term()
+        query = Query.call_term(Term.from_parsed('member(Y, [a, f(b)])'))
+        assert_equal(query.collect(Term.from_parsed('x')), ['x', 'x'])
+        query = Query(Predicate.from_name_arity('fail', 0))
+        assert_equal(query.collect(Y), [])
+
+        # call/1 is defined in system but its goal runs in the context module
+        Term.from_parsed('assertz(collect_fact(c))')(check=True)
+        Z = Term()
+        goal = Term.from_cons_functor(Functor('collect_fact', 1), Z)
+        query = Query(Predicate.from_name_arity('call', 1), goal,
+                      goal_context_module=Module(Atom('user')))
+        assert_equal(query.collect(Z), ['c'])
+
+
+def test_term_bytes():
+    with Frame():
+        term = Term.from_parsed('foo(X, [1, 2.5, "s"], X, Y, bar)')
+        data = term.to_bytes()
+        assert_is_instance(data, bytes)
+        copy = Term.from_bytes(data)
+        assert_equal(copy.to_python(), term.to_python())
+        assert_true(copy.get_arg(0).unify_integer(3))
+        assert_equal(copy.get_arg(2).get_integer(), 3)
+        assert_true(term.get_arg(0).is_variable())
+
+
+def test_term_record_bytes():
+    with Frame():
+        term = Term.from_parsed('f(a, [b, c])')
+        record = TermRecord(term)
+        data = record.to_bytes()
+        assert_equal(data, term.to_bytes())
+        assert_equal(TermRecord.from_bytes(data).get(), term)
+
+
+def test_term_pickle():
+    with Frame():
+        term = Term.from_parsed('foo(X, [1, 2.5, "s"], X, bar)')
+        unpickled = pickle.loads(pickle.dumps(term))
+        assert_is_instance(unpickled, Term)
+        assert_equal(unpickled.to_python(), term.to_python())
+        assert_true(unpickled.get_arg(0).unify_integer(3))
+        assert_equal(unpickled.get_arg(2).get_integer(), 3)
+        assert_equal(copy.copy(term)._handle, term._handle)
+
+
+def test_term_record_pickle():
+    with Frame():
+        term = Term.from_parsed('f(a, [b, c])')
+        record = pickle.loads(pickle.dumps(TermRecord(term)))
+        assert_is_instance(record, TermRecord)
+        assert_equal(record.get(), term)
+        assert_equal(copy.copy(record).get(), term)
+
+
+def test_term_store():
+    with tempfile.TemporaryDirectory() as directory:
+        path = directory + '/terms.db'
+        with Frame():
+            with TermStore(path) as store:
+                assert_equal(store.append(Term.from_parsed('foo(X, X)')), 0)
+                assert_equal(store[0].to_python(), ('foo', None, None))
+                for i in range(1, 100):
+                    assert_equal(store.append(Term.from_python([i, 'a'])), i)
+                assert_equal(store[50].to_python(), [50, 'a'])
+                assert_equal(len(store), 100)
+
+            with TermStore(path) as store:
+                assert_equal(len(store), 100)
+                term = store[0]
+                assert_true(term.get_arg(0).unify_integer(1))
+                assert_equal(term.get_arg(1).get_integer(), 1)
+                assert_equal(store[-1].to_python(), [99, 'a'])
+                assert_raises(IndexError, store.__getitem__, 100)
+
+
+def test_term_store_truncated_tail():
+    with tempfile.TemporaryDirectory() as directory:
+        path = directory + '/terms.db'
+        with Frame():
+            with TermStore(path) as store:
+                store.append(Term.from_python(['a']))
+                store.append(Term.from_python(['b']))
+            with open(path, 'r+b') as f:
+                f.truncate(os.path.getsize(path) - 1)
+
+            with TermStore(path) as store:
+                assert_equal(len(store), 1)
+                assert_equal(store.append(Term.from_python(['c'])), 1)
+
+            with TermStore(path) as store:
+                assert_equal(len(store), 2)
+                assert_equal(store[0].to_python(), ['a'])
+                assert_equal(store[1].to_python(), ['c'])
+
+
+def test_engine():
+    engine = Engine()
+    with engine:
+        with Frame():
+            assert_equal(Term.from_parsed('f(1)').to_python(), ('f', 1))
+    engine.destroy()
+
+
+def test_engine_pool():
+    pool = EnginePool(4)
+    succ = Predicate.from_name_arity('succ', 2)
+    results = {}
+
+    def work(i):
+        with pool.lease() as engine:
+            with pool.lease() as nested_engine:
+                assert engine is nested_engine
+            results[i] = succ.map(((j, None) for j in range(i, i + 100)),
+                                  out=1)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    assert_equal(results,
+                 {i: list(range(i + 1, i + 101)) for i in range(8)})
+
+
+def test_prolog_process_pool():
+    with Frame():
+        Term.from_parsed('assertz(pool_fact(1))')(check=True)
+        Term.from_parsed('assertz(pool_fact(2))')(check=True)
+        with PrologProcessPool(2) as pool:
+            assert_equal(pool.map(['pool_fact(X)', 'between(1, 3, X)', 'fail'],
+                                  template='X'),
+                         [[1, 2], [1, 2, 3], []])
+            X = Term()
+            goal = Functor('succ', 2)(Term.from_integer(4), X)
+            assert_equal(pool.submit(goal, X).result(), [5])
+            assert_equal(pool.submit('succ(X, 2)').result(), [('succ', 1, 2)])
+            assert_raises(PrologException,
+                          pool.submit('atom_length(X, Y)').result)
+
+    pool = PrologProcessPool(1)
+    future = pool.submit('repeat, fail')
+    pool.terminate()
+    assert_raises(RuntimeError, future.result)
+
+    engine = Engine()
+    assert_raises(RuntimeError, PrologProcessPool, 2)
+    engine.destroy()
+
+
+def test_prolog_executor():
+    executor = PrologExecutor(workers=2, max_pending=2)
+    succ = Predicate.from_name_arity('succ', 2)
+
+    async def calls():
+        return await asyncio.gather(*[
+            succ.acall(i, None, out=1, executor=executor) for i in range(10)])
+
+    assert_equal(asyncio.run(calls()), list(range(1, 11)))
+    assert_equal(executor.submit(succ.map, [(1, 3)]).result(), [False])
+    with Frame():
+        term = Term.from_integer(1)
+        assert_raises(TypeError, asyncio.run,
+                      succ.acall(('f', term), None, executor=executor))
+    assert_raises(PrologException, asyncio.run,
+                  succ.acall('a', None, executor=executor))
+    executor.shutdown()
+
+
+def test_query_asolutions():
+    executor = PrologExecutor()
+
+    async def solutions(query, template):
+        return [value async for value in query.asolutions(
+            template, executor=executor, max_pending=4)]
+
+    async def first_solution(query, template):
+        async for value in query.asolutions(template, executor=executor):
+            return value
+
+    with Frame():
+        X = Term()
+        query = Query(Predicate.from_name_arity('between', 3),
+                      Term.from_integer(1), Term.from_integer(100), X)
+        assert_equal(asyncio.run(solutions(query, X)), list(range(1, 101)))
+        assert_equal(asyncio.run(first_solution(query, X)), 1)
+        query = Query.call_term(Term.from_parsed('atom_length(_, _)'))
+        with assert_raises(PrologException):
+            asyncio.run(solutions(query, X))
+    executor.shutdown()
+
+
+def test_register_foreign():
+    def python_add(x, y, z):
+        return (x, y, x + y)
+
+    register_foreign(python_add)
+
+    @foreign_predicate(name='python_between', nondeterministic=True)
+    def between(low, high, value):
+        for i in range(low, high + 1):
+            yield (low, high, i)
+
+    @foreign_predicate()
+    def python_positive(x):
+        return x > 0
+
+    with Frame():
+        Z = Term()
+        assert_true(Functor('python_add', 3)(Term.from_integer(1),
+                                            Term.from_integer(2), Z)())
+        assert_equal(Z.get_integer(), 3)
+        assert_false(Term.from_parsed('python_add(1, 2, 4)')())
+
+        X = Term()
+        goal = Functor('python_between', 3)(Term.from_integer(1),
+                                            Term.from_integer(4), X)
+        assert_equal(Query.call_term(goal).collect(X), [1, 2, 3, 4])
+        assert_true(Term.from_parsed('python_between(1, 4, 3)')())
+        assert_true(Term.from_parsed('once(python_between(1, 4, _))')())
+
+        assert_true(Term.from_parsed('python_positive(1)')())
+        assert_false(Term.from_parsed('python_positive(-1)')())
+
+        error = Term()
+        assert_true(Functor('catch', 3)(
+            Term.from_parsed('python_add(a, 1, _)'), error,
+            Term.from_atom_name('true'))())
+        assert_equal(error.to_python()[:2], ('python_error', 'TypeError'))
+
+
+def test_stream_write():
+    output = io.BytesIO()
+    with Frame():
+        with Stream(output, 'w') as stream:
+            with Frame():
+                assert_true(Functor('write', 2)(
+                    stream.term, Term.from_parsed('foo("\u00e9", [1, 2])'))())
+            # The term is created anew after the inner frame was closed.
+            assert_true(Functor('write', 2)(
+                stream.term, Term.from_atom_name('.'))())
+        assert_true(stream.closed)
+    assert_equal(output.getvalue().decode('utf8'), 'foo(\u00e9,[1,2]).')
+
+
+def test_stream_read():
+    with Frame():
+        stream = Stream(b'foo(X, X). bar.\n')
+        first = Term()
+        second = Term()
+        read = Functor('read', 2)
+        assert_true(read(stream.term, first)())
+        assert_true(read(stream.term, second)())
+        assert_equal(first.to_python()[0], 'foo')
+        assert_equal(second.to_python(), 'bar')
+        assert_true(Functor('close', 1)(stream.term)())
+        assert_true(stream.closed)
+        stream.close()
+
+
+def test_stream_binary():
+    output = io.BytesIO()
+    with Frame():
+        with Stream(output, 'w', encoding=None) as stream:
+            assert_true(Functor('put_byte', 2)(stream.term,
+                                               Term.from_integer(200))())
+    assert_equal(output.getvalue(), bytes([200]))
+
+
+def test_consult_string():
+    consult_string('consulted(1).\nconsulted(2).\n'
+                   'consulted_twice(X, Y) :- consulted(X), Y is 2 * X.\n',
+                   module='consulted_module', source_id='consulted_source')
+    with Frame():
+        goal = Term.from_parsed('consulted_module:consulted_twice(_, X)')
+        assert_equal(Query.call_term(goal).collect(goal.get_arg(1).get_arg(1)),
+                     [2, 4])
+        consult_bytes('consulted(3).\n'.encode(), module='consulted_module',
+                      source_id='consulted_source')
+        goal = Term.from_parsed('consulted_module:consulted(X)')
+        assert_equal(Query.call_term(goal).collect(goal.get_arg(1).get_arg(0)),
+                     [3])
+
+
+def test_assert_facts():
+    rows = ((i, 'n{}'.format(i), [i]) for i in range(2500))
+    assert_equal(assert_facts('bulk_fact', rows, batch_size=1000), 2500)
+    assert_equal(assert_facts(Functor('bulk_fact', 3), [(-1, 'a', [])],
+                              module='bulk_module'), 1)
+    with Frame():
+        X = Term()
+        query = Query(Predicate.from_name_arity('bulk_fact', 3),
+                      X, Term(), Term())
+        assert_equal(query.collect(X), list(range(2500)))
+        goal = Term.from_parsed('bulk_module:bulk_fact(X, Y, Z)')
+        assert_equal(Query.call_term(goal).collect(goal.get_arg(1)),
+                     [('bulk_fact', -1, 'a', [])])
+
+
+def test_load_csv():
+    data = ('id,name,score,note\n'
+            '1,alice,2.5,"a, b"\n'
+            '\n'
+            '2,bob,-1,""\n'
+            '12345678901234567890,carol,0,c\n')
+    source = io.BytesIO(data.encode())
+    types = ['int', 'atom', 'float', 'string']
+    assert_equal(load_csv(source, 'csv_row', types, skip_header=True,
+                          batch_size=2), 3)
+    assert_false(source.closed)
+    with Frame():
+        row = Term.from_parsed('csv_row(Id, Name, Score, Note)')
+        assert_equal(Query.call_term(row).collect(row),
+                     [('csv_row', 1, 'alice', 2.5, 'a, b'),
+                      ('csv_row', 2, 'bob', -1.0, ''),
+                      ('csv_row', 12345678901234567890, 'carol', 0.0, 'c')])
+        assert_true(Term.from_parsed('csv_row(1, _, _, "a, b")')())
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = directory + '/rows.tsv'
+        with open(path, 'w') as file:
+            file.write('x\t1\ny\t2\n')
+        assert_equal(load_csv(path, Functor('tsv_row', 2), ['atom', 'int'],
+                              delimiter='\t', module='tsv_module'), 2)
+    with Frame():
+        row = Term.from_parsed('tsv_module:tsv_row(X, Y)')
+        assert_equal(Query.call_term(row).collect(row.get_arg(1)),
+                     [('tsv_row', 'x', 1), ('tsv_row', 'y', 2)])
+
+    assert_raises(ValueError, load_csv, io.BytesIO(b'1,2\n'), 'bad_row',
+                  ['int'])
+    assert_raises(ValueError, load_csv, io.BytesIO(b'a\n'), 'bad_row',
+                  ['int'])
+    assert_raises(ValueError, load_csv, io.BytesIO(b'a\n'), 'bad_row',
+                  ['date'])
+    assert_raises(ValueError, load_csv, io.BytesIO(b'1\n'),
+                  Functor('bad_row', 2), ['int'])
+
+
+def test_term_arena():
+    with Frame():
+        outer = Term()
+        with TermArena():
+            term = Term.from_parsed('foo(X, [1, 2])')
+            arg = term.get_arg(1)
+            termlist = TermList(3)
+            element = TermList(2)[0]
+            copied = Term.from_term(term)
+            item = arg.get_list_item(0)
+            assert_is_instance(term, TemporaryTerm)
+            # Wrappers of references from before the arena are not owned by it.
+            assert_equal(type(Term._from_handle(outer._handle)), Term)
+            assert_true(outer.unify(arg))
+        assert_equal(outer.to_python(), [1, 2])
+        assert_false(isinstance(Term(), TemporaryTerm))
+        for wrapper in (term, arg, element, copied, item):
+            with assert_raises(AttributeError):
+                wrapper.get_chars()
+        with assert_raises(AttributeError):
+            termlist[0]
+
+
+def test_term_arena_decorator():
+    @TermArena()
+    def parse(text):
+        return Term.from_parsed(text).to_python()
+
+    with Frame():
+        before = Term()._handle
+        for _ in range(1000):
+            assert_equal(parse('f(1, [a])'), ('f', 1, ['a']))
+        assert_equal(Term()._handle, before + 1)
+
+
+def test_frame_terms():
+    with Frame() as frame:
+        a, b, c = frame.terms(3)
+        assert_equal(b._handle, a._handle + 1)
+        assert_equal(c._handle, a._handle + 2)
+        assert_true(a.unify_integer(1))
+        args = frame.term_list(2)
+        args[0].put_integer(4)
+        assert_true(Predicate.from_name_arity('succ', 2)(arglist=args))
+        assert_equal(args[1].get_integer(), 5)
+        element = args[1]
+        assert_is_instance(element, TemporaryTerm)
+        assert_equal(frame.terms(0), [])
+        frame.rewind()
+        with assert_raises(AttributeError):
+            a.get_chars()
+        with assert_raises(AttributeError):
+            args[0]
+        with assert_raises(AttributeError):
+            element.get_chars()
+
+
+def test_temporary_generation():
+    with Frame() as frame:
+        terms = [frame.term() for _ in range(1000)]
+        frame.rewind()
+        assert_true(all(not hasattr(term, '_handle') for term in terms))
+        term = frame.term()
+        assert_true(term.unify_integer(1))
+        with TermArena():
+            nested = frame.term()
+        with assert_raises(AttributeError):
+            nested.get_chars()
+        assert_equal(term.get_integer(), 1)
+
+        X = Term()
+        query = Query(Predicate.from_name_arity('between', 3),
+                      Term.from_integer(1), Term.from_integer(3), X)
+        with query as active_query:
+            assert_true(active_query.next_solution())
+            solution = TemporaryTerm.from_term(X)
+            active_query.bind_temporary_term(solution)
+            assert_equal(solution.get_integer(), 1)
+            assert_true(active_query.next_solution())
+            with assert_raises(AttributeError):
+                solution.get_integer()
+
+    with TermArena():
+        with Frame() as frame:
+            term = frame.term()
+            frame.rewind()
+            with assert_raises(AttributeError):
+                term.get_chars()
+
+    # A term bound to a query stays bound to the frame that created it.
+    X = Term()
+    query = Query(Predicate.from_name_arity('between', 3),
+                  Term.from_integer(1), Term.from_integer(3), X)
+    with query as active_query:
+        assert_true(active_query.next_solution())
+        with Frame() as frame:
+            term = frame.term()
+            active_query.bind_temporary_term(term)
+            assert_true(term.is_variable())
+        with assert_raises(AttributeError):
+            term.get_chars()